@@ -1,5 +1,7 @@
 from typing import Dict, List, Deque
 from collections import deque
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 import json
 import statistics
 
@@ -20,6 +22,40 @@ class TradingState:
         self.order_depths = order_depths
         self.position = position
 
+class BookSide:
+    # One side of the book, sorted best-first, with cumulative volume built
+    # once per tick so a sweep finds its last level by bisection instead of
+    # walking and re-indexing the book level by level. Trader files are
+    # uploaded on their own, so it lives here rather than in a shared
+    # module; this is the only Trader whose placement walks book depth.
+    def __init__(self, levels: Dict[int, int], descending: bool):
+        self.prices = sorted(levels.keys(), reverse=descending)
+        self.volumes = [abs(levels[p]) for p in self.prices]
+        self.cumulative = list(accumulate(self.volumes))
+        # bisect needs ascending keys, so bids are searched on negated prices
+        self.keys = [-p for p in self.prices] if descending else self.prices
+        self.descending = descending
+
+    @property
+    def best(self):
+        return self.prices[0] if self.prices else 0
+
+    @property
+    def total_volume(self):
+        return self.cumulative[-1] if self.cumulative else 0
+
+    def sweep(self, quantity, limit):
+        # Ladder of (price, volume) that takes `quantity` from the best level
+        # outward without going through `limit`.
+        reachable = bisect_right(self.keys, -limit if self.descending else limit)
+        if reachable == 0 or quantity <= 0:
+            return []
+        last = min(bisect_left(self.cumulative, quantity, 0, reachable), reachable - 1)
+        ladder = list(zip(self.prices[:last], self.volumes[:last]))
+        filled = self.cumulative[last - 1] if last else 0
+        ladder.append((self.prices[last], min(self.volumes[last], quantity - filled)))
+        return ladder
+
 class Trader:
     def __init__(self):
         self.product_params = {
@@ -73,16 +109,14 @@ class Trader:
             print(f"Current Position: {current_position}")
 
             # Extract order book data
-            bid_prices = sorted(order_depth.buy_orders.keys(), reverse=True)
-            bid_volumes = [order_depth.buy_orders[p] for p in bid_prices]
-            ask_prices = sorted(order_depth.sell_orders.keys())
-            ask_volumes = [abs(order_depth.sell_orders[p]) for p in ask_prices]
+            bids = BookSide(order_depth.buy_orders, descending=True)
+            asks = BookSide(order_depth.sell_orders, descending=False)
 
-            print(f"Top Bids: {bid_prices[:3]}")
-            print(f"Top Asks: {ask_prices[:3]}")
+            print(f"Top Bids: {bids.prices[:3]}")
+            print(f"Top Asks: {asks.prices[:3]}")
             
-            best_bid = bid_prices[0] if bid_prices else 0
-            best_ask = ask_prices[0] if ask_prices else 0
+            best_bid = bids.best
+            best_ask = asks.best
             spread = best_ask - best_bid if best_ask and best_bid else 1.0
             print(f"Best Bid: {best_bid}, Best Ask: {best_ask}, Spread: {spread}")
 
@@ -95,10 +129,10 @@ class Trader:
                 print(f"[RAINFOREST_RESIN] Valuation: {valuation:.2f}")
 
                 if best_ask < valuation:
-                    target_volume = min(sum(ask_volumes), params['max_position'] - current_position)
+                    target_volume = min(asks.total_volume, params['max_position'] - current_position)
                     print(f"[RAINFOREST_RESIN] Buying signal: {target_volume} units")
                 elif best_bid > valuation:
-                    target_volume = -min(sum(bid_volumes), params['max_position'] + current_position)
+                    target_volume = -min(bids.total_volume, params['max_position'] + current_position)
                     print(f"[RAINFOREST_RESIN] Selling signal: {target_volume} units")
 
             # === STRATEGY: SQUID_INK ===
@@ -117,16 +151,16 @@ class Trader:
                     print(f"[SQUID_INK] Upper Band: {upper_band}, Lower Band: {lower_band}")
 
                     if mid_price < lower_band:
-                        target_volume = min(sum(ask_volumes), params['max_position'] - current_position)
+                        target_volume = min(asks.total_volume, params['max_position'] - current_position)
                         print(f"[SQUID_INK] Buy Signal: {target_volume} units")
                     elif mid_price > upper_band:
-                        target_volume = -min(sum(bid_volumes), params['max_position'] + current_position)
+                        target_volume = -min(bids.total_volume, params['max_position'] + current_position)
                         print(f"[SQUID_INK] Sell Signal: {target_volume} units")
 
             # === STRATEGY: DEFAULT/KELP ===
             else:
-                bid_vwap = self.calculate_vwap(bid_prices, bid_volumes, best_bid)
-                ask_vwap = self.calculate_vwap(ask_prices, ask_volumes, best_ask)
+                bid_vwap = self.calculate_vwap(bids.prices, bids.volumes, best_bid)
+                ask_vwap = self.calculate_vwap(asks.prices, asks.volumes, best_ask)
                 current_vwap = (bid_vwap + ask_vwap) / 2
                 print(f"[{product}] VWAP Valuation: {current_vwap:.2f}")
                 
@@ -139,42 +173,28 @@ class Trader:
                 if len(ask_history) == params['window_size']:
                     if best_ask <= min(ask_history):
                         if best_ask < current_vwap - spread/2.1:
-                            max_buy = min(sum(ask_volumes), params['max_position'] - current_position)
+                            max_buy = min(asks.total_volume, params['max_position'] - current_position)
                             target_volume = max_buy
                             print(f"[{product}] Buy Signal: {target_volume} units")
                 if len(bid_history) == params['window_size']:
                     if best_bid >= max(bid_history):
                         if best_bid > current_vwap + spread/2.1:
-                            max_sell = min(sum(bid_volumes), params['max_position'] + current_position)
+                            max_sell = min(bids.total_volume, params['max_position'] + current_position)
                             target_volume = -max_sell
                             print(f"[{product}] Sell Signal: {target_volume} units")
 
             # === Order Placement ===
             if target_volume > 0:
                 print(f"Placing Buy Orders for {product}")
-                cumulative = 0
-                for ask_price in ask_prices:
-                    if cumulative >= target_volume:
-                        break
-                    if ask_price > valuation:
-                        continue
-                    volume = min(abs(order_depth.sell_orders[ask_price]), target_volume - cumulative)
+                for ask_price, volume in asks.sweep(target_volume, valuation):
                     print(f"  Buying {volume} @ {ask_price}")
                     orders.append(Order(product, ask_price, int(2 * volume)))
-                    cumulative += volume
 
             elif target_volume < 0:
                 print(f"Placing Sell Orders for {product}")
-                cumulative = 0
-                for bid_price in bid_prices:
-                    if cumulative >= abs(target_volume):
-                        break
-                    if bid_price < valuation:
-                        continue
-                    volume = min(order_depth.buy_orders[bid_price], abs(target_volume) - cumulative)
+                for bid_price, volume in bids.sweep(-target_volume, valuation):
                     print(f"  Selling {volume} @ {bid_price}")
                     orders.append(Order(product, bid_price, int(-2 * volume)))
-                    cumulative += volume
 
             if orders:
                 params['last_trade_price'] = orders[0].price
@@ -0,0 +1,166 @@
+import sys
+
+import numpy as np
+
+from backtester import Backtester, load_trader, read_prices, read_trades, ticks_to_arrays
+
+# Performance analytics over a backtest's columnar fills. Positions and cash
+# per tick are bincounts of the fills cumulatively summed over time, marked
+# at the forward-filled mid to give a PnL curve per product; Sharpe, max
+# drawdown (maximum.accumulate) and time at the position limit come from
+# that curve. Each fill's PnL to the final mark, qty * (final mid - price),
+# adds up exactly to the product's PnL, so grouping it by the fill's
+# strategy id attributes PnL to strategies.
+#
+#   python analytics.py harshcheepak2.py prices_round_1_day_0.csv [trades_round_1_day_0.csv]
+
+
+def mid_prices(book):
+    # book[4, ticks, products, levels] -> mids[ticks, products], carrying the
+    # last two-sided mid forward like Backtester.last_mid.
+    bids, asks = book[0, :, :, 0], book[2, :, :, 0]
+    valid = (bids > 0) & (asks > 0)
+    mids = np.where(valid, (bids + asks) / 2, 0.0)
+    last = np.where(valid, np.arange(len(mids))[:, None], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return np.take_along_axis(mids, last, axis=0)
+
+
+def positions_and_cash(fills, timestamps, n_products):
+    # Position and cash per product after each tick.
+    ticks = np.searchsorted(timestamps, fills['timestamp'])
+    cells = ticks * n_products + fills['product']
+    size = len(timestamps) * n_products
+    quantity = fills['quantity'].astype(np.float64)
+    position = np.bincount(cells, weights=quantity, minlength=size).reshape(-1, n_products)
+    cash = np.bincount(cells, weights=-quantity * fills['price'], minlength=size).reshape(-1, n_products)
+    return np.cumsum(position, axis=0), np.cumsum(cash, axis=0)
+
+
+def strategy_pnl_curves(fills, timestamps, mids, n_products, n_strategies):
+    # pnl[tick, product, strategy]: each strategy's own position and cash
+    # marked at the product mid. Strategy id -1 goes in the last column;
+    # summing over strategies gives the product's PnL curve.
+    ticks = np.searchsorted(timestamps, fills['timestamp'])
+    strategy = np.where(fills['strategy'] >= 0, fills['strategy'], n_strategies - 1)
+    cells = (ticks * n_products + fills['product']) * n_strategies + strategy
+    size = len(timestamps) * n_products * n_strategies
+    quantity = fills['quantity'].astype(np.float64)
+    shape = (-1, n_products, n_strategies)
+    position = np.cumsum(np.bincount(cells, weights=quantity, minlength=size).reshape(shape), axis=0)
+    cash = np.cumsum(np.bincount(cells, weights=-quantity * fills['price'], minlength=size).reshape(shape), axis=0)
+    return cash + position * mids[:, :, None]
+
+
+def max_drawdown(pnl):
+    return (np.maximum.accumulate(pnl, axis=0) - pnl).max(axis=0)
+
+
+def sharpe(pnl):
+    # Mean over std of per-tick PnL changes, scaled by sqrt(ticks): a
+    # Sharpe ratio per run (per day for a day's data).
+    changes = np.diff(pnl, axis=0, prepend=0.0)
+    std = changes.std(axis=0)
+    return np.divide(changes.mean(axis=0) * len(changes) ** 0.5, std, out=np.zeros_like(std), where=std > 0)
+
+
+def strategy_names(trader):
+    # Traders that tag orders with strategy ids name them in a `strategies`
+    # class attribute, indexed by id; others get no per-strategy labels.
+    return list(getattr(trader, 'strategies', ()))
+
+
+def analyze(fills, products, timestamps, mids, limits=None, orders=None, names=()):
+    # fills/orders: FILL_DTYPE rows with product ids indexing `products`;
+    # mids[tick, product] aligned with `timestamps`; limits: position limit
+    # per product (default 50). Returns {product: metrics} plus 'TOTAL'.
+    n_products = len(products)
+    limits = np.array([(limits or {}).get(product, 50) for product in products])
+    position, cash = positions_and_cash(fills, timestamps, n_products)
+    pnl = cash + position * mids
+    total = pnl.sum(axis=1, keepdims=True)
+
+    quantity = fills['quantity'].astype(np.float64)
+    traded = np.abs(quantity)
+    notional = traded * fills['price']
+    # Strategy id -1 (no strategy) goes in the last column.
+    n_strategies = len(names) + 1
+    strategy = np.where(fills['strategy'] >= 0, fills['strategy'], n_strategies - 1)
+    cells = fills['product'] * n_strategies + strategy
+    size = n_products * n_strategies
+    final_mid = mids[-1] if len(mids) else np.zeros(n_products)
+    attribution = np.bincount(cells, weights=quantity * (final_mid[fills['product']] - fills['price']),
+                              minlength=size).reshape(n_products, n_strategies)
+    filled = np.bincount(cells, weights=traded, minlength=size).reshape(n_products, n_strategies)
+    fill_counts = np.bincount(cells, minlength=size).reshape(n_products, n_strategies)
+    if orders is not None:
+        order_strategy = np.where(orders['strategy'] >= 0, orders['strategy'], n_strategies - 1)
+        ordered = np.bincount(orders['product'] * n_strategies + order_strategy,
+                              weights=np.abs(orders['quantity']).astype(np.float64),
+                              minlength=size).reshape(n_products, n_strategies)
+
+    def ratio(numerator, denominator):
+        return float(numerator / denominator) if denominator else 0.0
+
+    report = {}
+    drawdowns, sharpes = max_drawdown(pnl), sharpe(pnl)
+    at_limit = (np.abs(position) >= limits).mean(axis=0) if len(position) else np.zeros(n_products)
+    turnover = np.bincount(fills['product'], weights=traded, minlength=n_products)
+    turnover_notional = np.bincount(fills['product'], weights=notional, minlength=n_products)
+    labels = list(names) + ['unknown']
+    for i, product in enumerate(products):
+        strategies = {}
+        active = fill_counts[i] > 0
+        if orders is not None:
+            active |= ordered[i] > 0
+        for k in np.flatnonzero(active):
+            strategies[labels[k]] = {
+                'pnl': float(attribution[i, k]),
+                'fills': int(fill_counts[i, k]),
+                'turnover': float(filled[i, k]),
+                'fill_ratio': ratio(filled[i, k], ordered[i, k]) if orders is not None else None,
+            }
+        report[product] = {
+            'pnl': float(pnl[-1, i]) if len(pnl) else 0.0,
+            'sharpe': float(sharpes[i]),
+            'max_drawdown': float(drawdowns[i]),
+            'turnover': float(turnover[i]),
+            'turnover_notional': float(turnover_notional[i]),
+            'fill_ratio': ratio(filled[i].sum(), ordered[i].sum()) if orders is not None else None,
+            'time_at_limit': float(at_limit[i]),
+            'strategies': strategies,
+        }
+    report['TOTAL'] = {
+        'pnl': float(total[-1, 0]) if len(total) else 0.0,
+        'sharpe': float(sharpe(total)[0]),
+        'max_drawdown': float(max_drawdown(total)[0]),
+        'turnover': float(traded.sum()),
+        'turnover_notional': float(notional.sum()),
+        'fill_ratio': ratio(filled.sum(), ordered.sum()) if orders is not None else None,
+    }
+    return report
+
+
+def analyze_backtest(backtester, ticks, names=()):
+    timestamps, _, book = ticks_to_arrays(ticks, backtester.products)
+    orders = backtester.order_log[:backtester.n_logged] if backtester.order_log is not None else None
+    limits = {product: backtester.limit(product) for product in backtester.products}
+    return analyze(backtester.fills[:backtester.n_fills], backtester.products, timestamps, mid_prices(book),
+                   limits, orders, names)
+
+
+if __name__ == '__main__':
+    trader = load_trader(sys.argv[1])()
+    ticks = read_prices(sys.argv[2])
+    trades = read_trades(sys.argv[3]) if len(sys.argv) > 3 else {}
+    backtester = Backtester(trader, record_orders=True)
+    backtester.run(ticks, trades)
+    report = analyze_backtest(backtester, ticks, strategy_names(trader))
+    for product, metrics in report.items():
+        at_limit = f"  at_limit={metrics['time_at_limit']:.1%}" if 'time_at_limit' in metrics else ''
+        print(f"{product:<18} pnl={metrics['pnl']:>10.1f}  sharpe={metrics['sharpe']:>6.2f}  "
+              f"max_dd={metrics['max_drawdown']:>9.1f}  turnover={metrics['turnover']:>8.0f}  "
+              f"fill_ratio={metrics['fill_ratio']:.1%}{at_limit}")
+        for strategy, row in metrics.get('strategies', {}).items():
+            print(f"    {strategy:<20} pnl={row['pnl']:>10.1f}  fills={row['fills']:>6}  "
+                  f"turnover={row['turnover']:>8.0f}  fill_ratio={row['fill_ratio']:.1%}")
@@ -0,0 +1,320 @@
+import csv
+import importlib.util
+import os
+import sys
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from datamodel import Observation, OrderDepth, Trade, TradingState
+
+# Offline replay of the exchange: feeds recorded order books to a Trader,
+# matches the returned orders against the visible book and keeps positions,
+# cash and fills.
+#
+#   python backtester.py harshcheepak2.py prices_round_1_day_0.csv [trades_round_1_day_0.csv]
+#   python backtester.py harshcheepak2.py round_1_day_0.tka   # see tick_archive.py
+
+FILL_DTYPE = np.dtype([('timestamp', np.int64), ('product', np.int32), ('price', np.int64),
+                       ('quantity', np.int32), ('strategy', np.int16)])
+ORDER_DTYPE = np.dtype([('product', np.int32), ('price', np.int64), ('quantity', np.int32), ('strategy', np.int16)])
+
+
+def load_trader(path):
+    # Trader files are named like "7-5-2025.py", so they can't be imported by name.
+    name = os.path.splitext(os.path.basename(path))[0].replace('-', '_').replace('(', '_').replace(')', '')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Trader
+
+
+def read_prices(path):
+    # Exchange price export: day;timestamp;product;bid_price_1;bid_volume_1;...;ask_volume_3;mid_price;profit_and_loss
+    books = defaultdict(dict)
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            depth = OrderDepth()
+            for level in range(1, 4):
+                bid, bid_volume = row.get(f'bid_price_{level}'), row.get(f'bid_volume_{level}')
+                ask, ask_volume = row.get(f'ask_price_{level}'), row.get(f'ask_volume_{level}')
+                if bid and bid_volume:
+                    depth.buy_orders[int(float(bid))] = int(float(bid_volume))
+                if ask and ask_volume:
+                    depth.sell_orders[int(float(ask))] = -int(float(ask_volume))
+            books[int(row['timestamp'])][row['product']] = depth
+    return sorted(books.items())
+
+
+def read_trades(path):
+    # Exchange trade export: timestamp;buyer;seller;symbol;currency;price;quantity
+    trades = defaultdict(lambda: defaultdict(list))
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            timestamp = int(row['timestamp'])
+            trades[timestamp][row['symbol']].append(
+                Trade(row['symbol'], int(float(row['price'])), int(row['quantity']),
+                      row.get('buyer') or None, row.get('seller') or None, timestamp))
+    return trades
+
+
+def ticks_to_arrays(ticks, products=None):
+    # Columnar form of a replay: book[field, tick, product, level] with fields
+    # bid price, bid volume, ask price, ask volume (ask volumes positive);
+    # a zero price marks an empty level.
+    if products is None:
+        products = sorted({product for _, depths in ticks for product in depths})
+    product_ids = {product: i for i, product in enumerate(products)}
+    levels = max([max(len(d.buy_orders), len(d.sell_orders)) for _, depths in ticks for d in depths.values()] or [1])
+    timestamps = np.array([timestamp for timestamp, _ in ticks], dtype=np.int64)
+    book = np.zeros((4, len(ticks), len(products), levels), dtype=np.int64)
+    for t, (_, depths) in enumerate(ticks):
+        for product, depth in depths.items():
+            i = product_ids[product]
+            for level, price in enumerate(sorted(depth.buy_orders, reverse=True)):
+                book[0, t, i, level] = price
+                book[1, t, i, level] = depth.buy_orders[price]
+            for level, price in enumerate(sorted(depth.sell_orders)):
+                book[2, t, i, level] = price
+                book[3, t, i, level] = -depth.sell_orders[price]
+    return timestamps, products, book
+
+
+def arrays_to_ticks(timestamps, products, book, start=0, end=None):
+    end = len(timestamps) if end is None else end
+    ticks = []
+    # One tolist() for the whole range: rows[tick][product] = (bid prices, bid volumes, ask prices, ask volumes)
+    rows = book[:, start:end].transpose(1, 2, 0, 3).tolist()
+    for timestamp, row in zip(timestamps[start:end].tolist(), rows):
+        depths = {}
+        for product, (bid_prices, bid_volumes, ask_prices, ask_volumes) in zip(products, row):
+            if not any(bid_prices) and not any(ask_prices):
+                continue
+            depth = OrderDepth()
+            depth.buy_orders = {p: v for p, v in zip(bid_prices, bid_volumes) if p}
+            depth.sell_orders = {p: -v for p, v in zip(ask_prices, ask_volumes) if p}
+            depths[product] = depth
+        ticks.append((timestamp, depths))
+    return ticks
+
+
+def orders_to_array(result, product_ids):
+    n = sum(len(orders) for orders in result.values())
+    array = np.zeros(n, dtype=ORDER_DTYPE)
+    i = 0
+    for product, orders in result.items():
+        for order in orders:
+            array[i] = (product_ids[product], order.price, order.quantity, -1)
+            i += 1
+    return array
+
+
+class Backtester:
+    def __init__(self, trader, position_limits=None, default_limit=50, record_orders=False):
+        self.trader = trader
+        self.position_limits = position_limits or {}
+        self.default_limit = default_limit
+        self.products = []
+        self.product_ids = {}
+        self.position = {}
+        self.cash = defaultdict(float)
+        self.last_mid = {}
+        self.trader_data = ''
+        self.own_trades = {}
+        self.fills = np.zeros(1024, dtype=FILL_DTYPE)
+        self.n_fills = 0
+        # Optional ledger of every submitted order (same columns as fills,
+        # product ids are ours), for fill ratios in analytics.py.
+        self.order_log = np.zeros(1024, dtype=FILL_DTYPE) if record_orders else None
+        self.n_logged = 0
+
+    def product_id(self, product):
+        if product not in self.product_ids:
+            self.product_ids[product] = len(self.products)
+            self.products.append(product)
+        return self.product_ids[product]
+
+    def limit(self, product):
+        return self.position_limits.get(product, self.default_limit)
+
+    def make_state(self, timestamp, order_depths, market_trades=None):
+        return TradingState(self.trader_data, timestamp, {}, order_depths, self.own_trades,
+                            market_trades or {}, dict(self.position), Observation({}, {}))
+
+    def step(self, timestamp, order_depths, market_trades=None):
+        for product in order_depths:
+            self.product_id(product)
+        state = self.make_state(timestamp, order_depths, market_trades)
+
+        # Traders with a columnar path hand back an ORDER_DTYPE array whose
+        # product column indexes trader.products; everything else returns the
+        # usual Dict[str, List[Order]].
+        if hasattr(self.trader, 'run_columnar'):
+            orders, conversions, trader_data = self.trader.run_columnar(state)
+            products = self.trader.products
+        else:
+            result, conversions, trader_data = self.trader.run(state)
+            orders = orders_to_array(result, self.product_ids)
+            products = self.products
+        self.settle(timestamp, order_depths, orders, products, trader_data)
+
+    def settle(self, timestamp, order_depths, orders, products, trader_data=''):
+        self.trader_data = trader_data if isinstance(trader_data, str) else ''
+        self.own_trades = {}
+        if self.order_log is not None:
+            self.log_orders(timestamp, orders, products)
+        self.match(timestamp, order_depths, orders, products)
+
+        for product, depth in order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                self.last_mid[product] = (max(depth.buy_orders) + min(depth.sell_orders)) / 2
+
+    def log_orders(self, timestamp, orders, products):
+        n = len(orders)
+        if n == 0:
+            return
+        while self.n_logged + n > len(self.order_log):
+            self.order_log = np.concatenate([self.order_log, np.zeros(len(self.order_log), dtype=FILL_DTYPE)])
+        # Traders that free product slots leave None in their products list.
+        ids = np.array([self.product_id(product) if product is not None else -1 for product in products],
+                       dtype=np.int32)
+        logged = self.order_log[self.n_logged:self.n_logged + n]
+        logged['timestamp'] = timestamp
+        logged['product'] = ids[orders['product']]
+        logged['price'] = orders['price']
+        logged['quantity'] = orders['quantity']
+        logged['strategy'] = orders['strategy']
+        self.n_logged += n
+
+    def match(self, timestamp, order_depths, orders, products, books=None):
+        # books: {product: (bids, asks)} left over from earlier matches against
+        # the same order_depths, so liquidity taken then is not offered again.
+        if len(orders) == 0:
+            return
+        rows = list(zip(orders['product'].tolist(), orders['price'].tolist(),
+                        orders['quantity'].tolist(), orders['strategy'].tolist()))
+
+        # Like the exchange, reject every order for a product if filling all of
+        # them could take the position past its limit.
+        buys = defaultdict(int)
+        sells = defaultdict(int)
+        for product_id, price, quantity, strategy in rows:
+            if quantity > 0:
+                buys[product_id] += quantity
+            else:
+                sells[product_id] -= quantity
+        rejected = set()
+        for product_id in set(buys) | set(sells):
+            product = products[product_id]
+            position = self.position.get(product, 0)
+            limit = self.limit(product)
+            if position + buys[product_id] > limit or position - sells[product_id] < -limit:
+                rejected.add(product_id)
+
+        books = {} if books is None else books
+        for product_id, price, quantity, strategy in rows:
+            if product_id in rejected or quantity == 0:
+                continue
+            product = products[product_id]
+            depth = order_depths.get(product)
+            if depth is None:
+                continue
+            if product not in books:
+                books[product] = (
+                    [[p, v] for p, v in sorted(depth.buy_orders.items(), reverse=True)],
+                    [[p, -v] for p, v in sorted(depth.sell_orders.items())],
+                )
+            bids, asks = books[product]
+            levels = asks if quantity > 0 else bids
+            remaining = abs(quantity)
+            for level in levels:
+                if remaining == 0:
+                    break
+                if level[1] == 0:
+                    continue
+                if (quantity > 0 and level[0] > price) or (quantity < 0 and level[0] < price):
+                    break
+                filled = min(remaining, level[1])
+                level[1] -= filled
+                remaining -= filled
+                self.fill(timestamp, product, level[0], filled if quantity > 0 else -filled, strategy)
+
+    def fill(self, timestamp, product, price, quantity, strategy=-1):
+        if self.n_fills == len(self.fills):
+            self.fills = np.concatenate([self.fills, np.zeros(len(self.fills), dtype=FILL_DTYPE)])
+        self.fills[self.n_fills] = (timestamp, self.product_id(product), price, quantity, strategy)
+        self.n_fills += 1
+        self.position[product] = self.position.get(product, 0) + quantity
+        self.cash[product] -= price * quantity
+        buyer, seller = ('SUBMISSION', '') if quantity > 0 else ('', 'SUBMISSION')
+        self.own_trades.setdefault(product, []).append(Trade(product, price, abs(quantity), buyer, seller, timestamp))
+
+    def run(self, ticks, market_trades=None):
+        market_trades = market_trades or {}
+        collect_garbage = getattr(self.trader, 'gc_between_ticks', False) and self.trader.collect_garbage
+        for timestamp, order_depths in ticks:
+            self.step(timestamp, order_depths, market_trades.get(timestamp))
+            if collect_garbage:
+                collect_garbage()
+        return self.pnl()
+
+    def pnl(self):
+        return {product: self.cash[product] + self.position.get(product, 0) * self.last_mid.get(product, 0)
+                for product in self.products}
+
+
+def allocation_profile(trader, ticks, warmup=100, window=50):
+    # Net memory blocks still allocated after each window of `window`
+    # run_columnar calls once the histories are full, from tracemalloc traces
+    # outside this file (the states are built up front). Stored ints flip
+    # between CPython's cached small ints and fresh objects, so single
+    # windows read a few blocks either way; a leak shows as a total that
+    # grows with the number of ticks.
+    backtester = Backtester(trader)
+    states = [backtester.make_state(timestamp, order_depths) for timestamp, order_depths in ticks]
+
+    def held():
+        # Compared by name: filter_traces would compile (and trace) patterns.
+        return sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename')
+                   if stat.traceback[0].filename not in (__file__, tracemalloc.__file__))
+
+    deltas = []
+    # Traced from the start, so values replaced later were traced when made.
+    tracemalloc.start()
+    try:
+        for state in states[:warmup]:
+            trader.run_columnar(state)
+        before = held()
+        for first in range(warmup, len(states) - window + 1, window):
+            for state in states[first:first + window]:
+                trader.run_columnar(state)
+            after = held()
+            deltas.append(after - before)
+            before = after
+    finally:
+        tracemalloc.stop()
+    return deltas
+
+
+if __name__ == '__main__':
+    trader = load_trader(sys.argv[1])()
+    if sys.argv[2].endswith('.tka'):
+        from tick_archive import TickArchive
+        archive = TickArchive(sys.argv[2])
+        ticks, trades = archive.ticks(), archive.market_trades()
+    else:
+        ticks = read_prices(sys.argv[2])
+        trades = read_trades(sys.argv[3]) if len(sys.argv) > 3 else {}
+    backtester = Backtester(trader)
+    pnl = backtester.run(ticks, trades)
+    for product in backtester.products:
+        print(f"{product}: position={backtester.position.get(product, 0)} pnl={pnl[product]:.1f}")
+    print(f"TOTAL: {sum(pnl.values()):.1f} over {len(ticks)} ticks, {backtester.n_fills} fills")
+    if hasattr(trader, 'degradation_report'):
+        for product, (count, rate) in trader.degradation_report().items():
+            print(f"{product}: degraded to fallback quote on {count} ticks ({rate:.1%})")
+    if hasattr(trader, 'bandit_report'):
+        for product, arms in trader.bandit_report().items():
+            for strategy, (pulls, shadow_pnl) in arms.items():
+                print(f"{product} {strategy}: live on {pulls} ticks, shadow pnl={shadow_pnl:.1f}")
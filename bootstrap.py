@@ -0,0 +1,137 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analytics import mid_prices, strategy_names, strategy_pnl_curves
+from backtester import Backtester, load_trader, read_prices, read_trades, ticks_to_arrays
+
+# Moving-block bootstrap confidence intervals for PnL and Sharpe, per product
+# and per (product, strategy). Per-tick PnL changes are resampled in blocks
+# of consecutive ticks, which keeps their autocorrelation (inventory held
+# over many ticks). A resampled path's PnL and Sharpe only need the sum and
+# sum of squares of its changes, so every block's sums are precomputed from
+# prefix sums and a resample is a gather over block start indices: the
+# cost is resamples x blocks, not resamples x ticks. Resamples are split
+# into fixed chunks of RESAMPLES_PER_CHUNK, each with its own seed spawned
+# from the run's seed, and the chunks are handed out to a process pool: the
+# result depends on the seed and n_resamples, not on the number of workers.
+#
+#   python bootstrap.py harshcheepak2.py prices.csv [trades.csv] --resamples 5000 --block 50
+
+BLOCK_SUMS = None
+GATHER_CELLS = 1 << 22  # floats per gathered chunk in resample, 32 MB
+RESAMPLES_PER_CHUNK = 250
+
+
+def block_sums(changes, block):
+    # Sums and sums of squares of every window of `block` consecutive ticks,
+    # plus of the shorter window that completes the path to len(changes).
+    prefix = np.zeros((len(changes) + 1, changes.shape[1]))
+    np.cumsum(changes, axis=0, out=prefix[1:])
+    prefix_squares = np.zeros_like(prefix)
+    np.cumsum(changes * changes, axis=0, out=prefix_squares[1:])
+    remainder = len(changes) % block
+
+    def windows(prefix, length):
+        return prefix[length:] - prefix[:len(prefix) - length] if length else np.zeros((1, changes.shape[1]))
+
+    return (windows(prefix, block), windows(prefix_squares, block),
+            windows(prefix, remainder), windows(prefix_squares, remainder), len(changes) // block)
+
+
+def init_worker(sums):
+    global BLOCK_SUMS
+    BLOCK_SUMS = sums
+
+
+def resample(seed, n_resamples, n_ticks):
+    # (pnl, sharpe) of n_resamples bootstrapped paths, each [resample, series].
+    full, full_squares, tail, tail_squares, n_blocks = BLOCK_SUMS
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, len(full), (n_resamples, n_blocks))
+    tail_starts = rng.integers(0, len(tail), n_resamples)
+    total = tail[tail_starts]
+    squares = tail_squares[tail_starts]
+    # Gathered a few blocks at a time: all of them at once would be a
+    # [resample, block, series] array, gigabytes for a day of ticks.
+    step = max(1, GATHER_CELLS // max(1, n_resamples * full.shape[1]))
+    for first in range(0, n_blocks, step):
+        columns = starts[:, first:first + step]
+        total += full[columns].sum(axis=1)
+        squares += full_squares[columns].sum(axis=1)
+    mean = total / n_ticks
+    std = np.sqrt(np.maximum(squares / n_ticks - mean * mean, 0.0))
+    sharpe = np.divide(mean * n_ticks ** 0.5, std, out=np.zeros_like(std), where=std > 0)
+    return total, sharpe
+
+
+def bootstrap(curves, n_resamples=2000, block=None, workers=None, seed=0):
+    # curves[tick, series] are cumulative PnL paths; returns the resampled
+    # (pnl, sharpe), each [resample, series].
+    changes = np.diff(curves, axis=0, prepend=0.0)
+    n_ticks = len(changes)
+    block = block or max(1, round(n_ticks ** (1 / 3)))
+    sums = block_sums(changes, min(block, n_ticks))
+    seeds = np.random.SeedSequence(seed).spawn(max(1, -(-n_resamples // RESAMPLES_PER_CHUNK)))
+    sizes = [len(part) for part in np.array_split(np.arange(n_resamples), len(seeds))]
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(sums,)) as pool:
+        parts = list(pool.map(resample, seeds, sizes, [n_ticks] * len(seeds)))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def confidence_intervals(curves, labels, n_resamples=2000, block=None, workers=None, confidence=0.95, seed=0):
+    # {label: {'pnl': (point, low, high), 'sharpe': (point, low, high)}}
+    pnl, sharpe = bootstrap(curves, n_resamples, block, workers, seed)
+    tails = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    pnl_bounds = np.percentile(pnl, tails, axis=0)
+    sharpe_bounds = np.percentile(sharpe, tails, axis=0)
+    changes = np.diff(curves, axis=0, prepend=0.0)
+    std = changes.std(axis=0)
+    point_sharpe = np.divide(changes.mean(axis=0) * len(changes) ** 0.5, std, out=np.zeros_like(std), where=std > 0)
+    return {label: {'pnl': (float(curves[-1, k]), float(pnl_bounds[0, k]), float(pnl_bounds[1, k])),
+                    'sharpe': (float(point_sharpe[k]), float(sharpe_bounds[0, k]), float(sharpe_bounds[1, k]))}
+            for k, label in enumerate(labels)}
+
+
+def backtest_curves(backtester, ticks, names=()):
+    # PnL curves for each product and each (product, strategy) that traded.
+    timestamps, _, book = ticks_to_arrays(ticks, backtester.products)
+    fills = backtester.fills[:backtester.n_fills]
+    labels = list(names) + ['unknown']
+    by_strategy = strategy_pnl_curves(fills, timestamps, mid_prices(book), len(backtester.products), len(labels))
+    columns = [by_strategy.sum(axis=2)]
+    names_out = list(backtester.products)
+    for i, product in enumerate(backtester.products):
+        traded = np.unique(fills['strategy'][fills['product'] == i])
+        for k in np.where(traded >= 0, traded, len(labels) - 1):
+            columns.append(by_strategy[:, i, k:k + 1])
+            names_out.append(f'{product}/{labels[k]}')
+    return np.concatenate(columns, axis=1), names_out
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trader')
+    parser.add_argument('prices')
+    parser.add_argument('trades', nargs='?')
+    parser.add_argument('--resamples', type=int, default=2000)
+    parser.add_argument('--block', type=int, default=None, help='ticks per block (default: cube root of ticks)')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    trader = load_trader(args.trader)()
+    ticks = read_prices(args.prices)
+    backtester = Backtester(trader)
+    backtester.run(ticks, read_trades(args.trades) if args.trades else {})
+    curves, labels = backtest_curves(backtester, ticks, strategy_names(trader))
+    began = time.perf_counter()
+    intervals = confidence_intervals(curves, labels, args.resamples, args.block, args.workers, args.confidence)
+    seconds = time.perf_counter() - began
+    for label, row in intervals.items():
+        (pnl, pnl_low, pnl_high), (sharpe, sharpe_low, sharpe_high) = row['pnl'], row['sharpe']
+        print(f"{label:<36} pnl={pnl:>9.1f} [{pnl_low:>9.1f}, {pnl_high:>9.1f}]  "
+              f"sharpe={sharpe:>6.2f} [{sharpe_low:>6.2f}, {sharpe_high:>6.2f}]")
+    print(f"{args.resamples} resamples x {len(labels)} series in {seconds:.2f}s")
@@ -0,0 +1,42 @@
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+from backtester import read_prices
+
+# Offline fit of the 'kalman' valuation_strategy parameters in harshcheepak2.py.
+# Under the local-level model the first differences of the mid price have
+# variance q + 2r and lag-1 autocovariance -r, which gives both directly.
+#
+#   python calibrate.py prices_round_1_day_0.csv [prices_round_1_day_1.csv ...]
+
+
+def mid_prices(ticks):
+    mids = defaultdict(list)
+    for timestamp, order_depths in ticks:
+        for product, depth in order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                mids[product].append((max(depth.buy_orders) + min(depth.sell_orders)) / 2)
+    return {product: np.array(prices) for product, prices in mids.items()}
+
+
+def estimate_local_level(prices, floor=1e-6):
+    changes = np.diff(prices)
+    if len(changes) < 3:
+        return floor, floor
+    changes = changes - changes.mean()
+    variance = np.dot(changes, changes) / len(changes)
+    autocovariance = np.dot(changes[1:], changes[:-1]) / len(changes)
+    r = max(-autocovariance, floor)
+    q = max(variance - 2 * r, floor)
+    return q, r
+
+
+if __name__ == '__main__':
+    ticks = []
+    for path in sys.argv[1:]:
+        ticks.extend(read_prices(path))
+    for product, prices in sorted(mid_prices(ticks).items()):
+        q, r = estimate_local_level(prices)
+        print(f"{product}: 'kalman_q': {q:.4g}, 'kalman_r': {r:.4g}")
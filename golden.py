@@ -0,0 +1,133 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from backtester import load_trader
+from recorder import Replayer
+
+# Golden-replay regression checks. A recorded session (recorder.py) is
+# replayed through a Trader and each product's orders on each tick are
+# reduced to an 8-byte digest; digests are then hashed per chunk of ticks.
+# The golden file keeps both levels, so a check compares a handful of chunk
+# hashes and only looks at per-tick digests inside the first chunk that
+# differs, to name the first tick where a product's orders changed.
+#
+#   python golden.py record harshcheepak2.py sessions/*.trlog   # after a deliberate change
+#   python golden.py check harshcheepak2.py sessions/*.trlog
+#
+# Golden files live in golden/ next to this file and are committed with the
+# sessions they were recorded from, so any checkout can run the check.
+# sessions/synthetic_seed0.trlog is 500 ticks of synthetic_market.py
+# (default_products(3), seed 0) as harshcheepak2.py traded them.
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+
+
+def order_digest(orders):
+    return int.from_bytes(hashlib.blake2b(repr(orders).encode(), digest_size=8).digest(), 'little')
+
+
+def log_products(replayer):
+    return sorted({product for state, _ in replayer.records() for product in state[3]})
+
+
+def chunk_hashes(digests, chunk_size):
+    # digests[tick, product] -> hashes[chunk, product] (hex)
+    return [[hashlib.blake2b(np.ascontiguousarray(digests[start:start + chunk_size, i]).tobytes(),
+                             digest_size=16).hexdigest() for i in range(digests.shape[1])]
+            for start in range(0, len(digests), chunk_size)]
+
+
+def replay_digests(trader, replayer, products, golden=None):
+    # Per-tick digests of the trader's orders on the log. With a golden
+    # digest array, stops once every product has diverged from it. The
+    # trader's own prints go to devnull.
+    index = {product: i for i, product in enumerate(products)}
+    rows = []
+    timestamps = []
+    diverged = set()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for tick, (timestamp, _, replayed) in enumerate(replayer.replay(trader)):
+            row = [order_digest(replayed.get(product, [])) for product in products]
+            rows.append(row)
+            timestamps.append(timestamp)
+            if golden is not None:
+                if tick >= len(golden):
+                    break
+                diverged.update(product for product in products
+                                if row[index[product]] != golden[tick, index[product]])
+                if len(diverged) == len(products):
+                    break
+    return np.array(rows, dtype=np.uint64).reshape(-1, len(products)), timestamps
+
+
+def golden_path(directory, log):
+    return os.path.join(directory, os.path.basename(log) + '.golden.npz')
+
+
+def record_golden(trader_class, log, path, chunk_size=1000):
+    replayer = Replayer(log)
+    products = log_products(replayer)
+    digests, timestamps = replay_digests(trader_class(), replayer, products)
+    meta = {'products': products, 'chunk_size': chunk_size, 'chunks': chunk_hashes(digests, chunk_size)}
+    np.savez_compressed(path, digests=digests, timestamps=np.array(timestamps, dtype=np.int64),
+                        meta=np.array(json.dumps(meta)))
+    return len(digests)
+
+
+def check_golden(trader_class, log, path):
+    # {product: None if identical, else (tick, timestamp)} of the first divergence.
+    stored = np.load(path)
+    meta = json.loads(str(stored['meta']))
+    golden, golden_timestamps = stored['digests'], stored['timestamps']
+    products, chunk_size = meta['products'], meta['chunk_size']
+    digests, _ = replay_digests(trader_class(), Replayer(log), products, golden)
+
+    first = {product: None for product in products}
+    candidate_chunks = chunk_hashes(digests, chunk_size)
+    for chunk, (expected, actual) in enumerate(zip(meta['chunks'], candidate_chunks)):
+        for i, product in enumerate(products):
+            if first[product] is not None or expected[i] == actual[i]:
+                continue
+            # Chunks before this one match, so the first differing tick is in it.
+            start = chunk * chunk_size
+            end = min(start + chunk_size, len(digests), len(golden))
+            ticks = np.flatnonzero(golden[start:end, i] != digests[start:end, i])
+            tick = start + int(ticks[0]) if len(ticks) else end  # only the lengths differ
+            first[product] = (tick, int(golden_timestamps[min(tick, len(golden_timestamps) - 1)]))
+    return first
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', choices=('record', 'check'))
+    parser.add_argument('trader')
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--golden-dir', default=GOLDEN_DIR)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    trader_class = load_trader(args.trader)
+    os.makedirs(args.golden_dir, exist_ok=True)
+    failed = False
+    for log in args.logs:
+        path = golden_path(args.golden_dir, log)
+        if args.command == 'record':
+            ticks = record_golden(trader_class, log, path, args.chunk_size)
+            print(f"{log}: recorded {ticks} ticks to {path}")
+            continue
+        if not os.path.exists(path):
+            failed = True
+            print(f"{log}: no golden file at {path}, record one first")
+            continue
+        for product, divergence in check_golden(trader_class, log, path).items():
+            if divergence is None:
+                print(f"{log} {product}: identical")
+            else:
+                failed = True
+                print(f"{log} {product}: orders diverge from tick {divergence[0]} (timestamp {divergence[1]})")
+    raise SystemExit(1 if failed else 0)
@@ -1,8 +1,52 @@
+from bisect import bisect_right
+from collections import OrderedDict
 from typing import Dict, List
-from collections import deque
+import gc
 import json
+import random
+import time
 import numpy as np
 
+# One row per order. Strategies write into a preallocated array of these
+# rows instead of building an Order object per order per tick; run() turns
+# the rows back into the Order dict the exchange expects.
+ORDER_DTYPE = np.dtype([('product', np.int32), ('price', np.int64), ('quantity', np.int32), ('strategy', np.int16)])
+STRATEGIES = ('zscore', 'crossover', 'momentum', 'bollinger', 'breakout', 'moving_average',
+              'fair_price_mm', 'trend_follow_sl', 'orderbook_imbalance', 'keltner_channel', 'fallback_quote')
+HISTORY_SIZE = 50
+# Prices in the strategy layer are integers in 1/PRICE_SCALE ticks, so a book
+# mid (best_bid + best_ask half-ticks) is exact, histories are int64 and bands
+# are compared in exact integer arithmetic. EMA/Kalman state carries
+# VALUE_BITS more bits of fixed point and reaches the strategies rounded to
+# 1/PRICE_SCALE of a tick, not to a half-tick; only order prices are whole
+# ticks. PRICE_SCALE = 512 keeps a history's sum of squares within int64 for
+# prices up to 100k ticks.
+PRICE_SCALE = 512
+HALF_TICK = PRICE_SCALE // 2
+VALUE_BITS = 16
+VALUE_ROUND = 1 << (VALUE_BITS - 1)
+TRADER_DATA = json.dumps({})
+STRATEGY_IDS = {strategy: i for i, strategy in enumerate(STRATEGIES)}
+# Per-strategy bookkeeping kept in product_params, swapped per arm by the bandit.
+STRATEGY_STATE = {'momentum': ('buy_price',), 'trend_follow_sl': ('buy_price', 'cooldown', 'trailing_stop')}
+BANDIT_ARMS = ('zscore', 'bollinger', 'keltner_channel', 'fair_price_mm', 'moving_average')
+# 'fair_price_mm' quote ladder defaults (ticks and lots), see quote_ladder.
+MM_DEFAULTS = {'mm_levels': 3, 'mm_size': 10, 'mm_spread': 1, 'mm_step': 1, 'mm_skew': 2, 'mm_widen': 1,
+               'mm_vol_buckets': (1.0, 2.0, 4.0)}
+# Configuration for symbols not listed in Trader.product_params, copied for
+# each new symbol the first time it appears (Trader(template=...) overrides keys).
+PRODUCT_TEMPLATE = {
+    'strategy': 'zscore',
+    'valuation_strategy': 'ema',
+    'window_size': 10,
+    'max_position': 50,
+    'ema': None,
+    'position_sizing': 'combined',
+    'base_qty': 10,
+    'priority': 10,
+    'fallback_spread': 1,
+}
+
 class Order:
     def __init__(self, symbol, price, quantity):  # fixed typo: _init_ → __init__
         self.symbol = symbol
@@ -21,19 +65,27 @@ class TradingState:
         self.position = position
 
 class Trader:
-    def __init__(self):  # fixed typo
-        self.product_params = {
+    # Strategy ids in the order book are indexes into this; tools name them by it.
+    strategies = STRATEGIES
+
+    def __init__(self, gc_between_ticks=False, gc_interval=100, time_budget=0.8, params=None, warm_start=None,
+                 template=None, evict_after=1000, max_products=256):  # fixed typo
+        self.product_config = {
         'KELP': {
             'strategy': 'keltner',
-            'valuation_strategy': 'ema',  # 'true_value', 'vwap', 'mid', etc.
+            'valuation_strategy': 'ema',  # 'true_value', 'vwap', 'mid', 'ema', 'kalman'
             'true_value': 2000.0,  # only used if valuation_strategy == 'true_value'
+            # 'kalman' needs 'kalman_q' (level noise) and 'kalman_r' (quote noise)
+            # variances, fit per product with calibrate.py on recorded prices.
             'window_size': 10,
             'max_position': 50,
-            'price_history': deque(maxlen=50),
             'ema': None,
             'buy_price': None,
-            'position_sizing': 'combined',  # options: 'fixed', 'volatility_adjusted', 'confidence_weighted', 'combined'
-            'base_qty': 10
+            'position_sizing': 'combined',  # options: 'fixed', 'volatility_adjusted', 'confidence_weighted', 'combined', 'vol_target', 'risk_parity'
+            'base_qty': 10,
+            'target_risk': 10.0,  # 'vol_target': lots * per-tick price std to aim for
+            'priority': 0,  # lower runs first when the tick is short on time
+            'fallback_spread': 1
         },
         'RAINFOREST_RESIN': {
             'strategy': 'zscore',
@@ -41,10 +93,11 @@ class Trader:
             'true_value': 10000.0,
             'window_size': 3,
             'max_position': 50,
-            'price_history': deque(maxlen=50),
             'ema': None,
             'position_sizing': 'combined',  # options: 'fixed', 'volatility_adjusted', 'confidence_weighted', 'combined'
-            'base_qty': 10
+            'base_qty': 10,
+            'priority': 1,  # lower runs first when the tick is short on time
+            'fallback_spread': 1
         },
         'SQUID_INK': {
             'strategy': 'bollinger',
@@ -52,26 +105,437 @@ class Trader:
             'true_value': 2000.0,
             'window_size': 3,
             'max_position': 50,
-            'price_history': deque(maxlen=50),
             'ema': None,
             'position_sizing': 'combined',  # options: 'fixed', 'volatility_adjusted', 'confidence_weighted', 'combined'
-            'base_qty': 10
+            'base_qty': 10,
+            'priority': 2,  # lower runs first when the tick is short on time
+            'fallback_spread': 1
         }
     }
+        # Per-product overrides (e.g. from a parameter sweep) go in before any
+        # derived state below is built from them. Symbols without a config
+        # get a copy of the template, overrides included.
+        self.template = {**PRODUCT_TEMPLATE, **(template or {})}
+        for product, overrides in (params or {}).items():
+            self.product_config.setdefault(product, dict(self.template)).update(overrides)
+        self.active_strategy_id = -1
+        self.orders = np.zeros(64, dtype=ORDER_DTYPE)
+        self.n_orders = 0
+
+        # Deadline-aware scheduling: products run in priority order, each with
+        # a running estimate of its strategy cost, and any product that would
+        # overrun time_budget (seconds per run call) skips its strategy for
+        # the cheap fallback quote around its current value. Valuation and
+        # the price history are O(1) and updated every tick regardless.
+        self.time_budget = time_budget
+        self.clock = time.perf_counter
+        self.ticks = 0
+        self.degraded = {}
+        self.quoted = {}  # ticks each product had a book, for degradation_report
+
+        # Exponentially weighted covariance of per-tick mid changes across all
+        # products, updated in place with one rank-1 step per tick. Sizing
+        # modes 'vol_target' and 'risk_parity' read their lots from it.
+        self.cov_decay = 0.94
+        self.cov_warmup = 20
+        self.risk_budget = 25.0  # 'risk_parity': portfolio per-tick PnL std to aim for
+        self.cov_count = 0
+        self.grow(len(self.product_config))
+
+        # 'bandit' strategy: candidate arms per product (p['arms'], default
+        # BANDIT_ARMS) evaluated in shadow; see bandit_strategy.
+        self.bandit_decay = 0.99
+        # Thompson draws cycle through a fixed pool of normals; drawing a
+        # fresh one per arm per tick cost more than the arm itself.
+        rng = random.Random(0)
+        self.normals = [rng.gauss(0.0, 1.0) for _ in range(4096)]
+        self.normal_index = 0
+        self.shadow_state = TradingState(0, {}, {})
+
+        # Per-product state (product_params) is allocated when a symbol is
+        # first seen, configured symbols up front, and dropped again once a
+        # symbol has been absent for evict_after ticks or, past max_products,
+        # for the least recently seen one. Each live product holds a slot:
+        # its index in products, in the covariance and in the order rows.
+        # Freed slots go to the next new symbol.
+        self.evict_after = evict_after
+        # A soft cap: symbols seen on the current tick are never evicted, so
+        # a tick quoting more than max_products symbols allocates them all,
+        # and the excess goes again as they fall idle.
+        self.max_products = max_products
+        self.product_params = {}
+        self.products = []
+        self.product_ids = {}
+        self.free_slots = []
+        self.last_seen = OrderedDict()
+        self.priority_order = []
+
+        # Precomputed indicator series, one row per recorded price of a
+        # product: (mid, mean, std, atr, slope, timestamp) over the price
+        # history. A sweep fills this from indicator_cache.py so configurations
+        # sharing a price series don't each recompute them; empty when trading
+        # live.
+        self.indicator_cache = {}
+        self.timestamp = None
+        for product in self.product_config:
+            self.activate(product)
+
+        # Indicator temporaries go into scratch instead of fresh arrays every
+        # tick. Slopes use doubled, so integer, offsets from the window centre.
+        self.scratch = np.zeros(HISTORY_SIZE, dtype=np.int64)
+        self.slope_x = [2 * np.arange(n) - (n - 1) for n in range(HISTORY_SIZE + 1)]
+        self.slope_denom = [int(np.dot(x, x)) or 1 for x in self.slope_x]
+
+        # Strategies wait for window_size prices (7 for crossover) before
+        # trading. warm_start preloads the histories, EMA/Kalman valuations
+        # and covariance so they trade from the first tick: either a
+        # snapshot() of an earlier Trader or the tail of recorded data as
+        # [{product: mid}, ...], oldest first (see warm_start.py).
+        if warm_start:
+            self.warm_start(warm_start)
+
+        # Everything built above lives for the whole session, so move it out of
+        # the cyclic GC's way and, if asked, only collect between ticks.
+        self.gc_between_ticks = gc_between_ticks
+        self.gc_interval = gc_interval
+        self.ticks_since_gc = 0
+        if gc_between_ticks:
+            gc.collect()
+            gc.freeze()
+            gc.disable()
+
+    def kalman_gain(self, q, r):
+        # Local-level model: fair value random-walks with variance q per tick
+        # and each quote adds noise of variance r. The filter's gain settles
+        # at a constant, so it is solved once here and each tick is
+        # x += gain * (mid - x).
+        prior = (q + (q * q + 4 * q * r) ** 0.5) / 2
+        return prior / (prior + r)
+
+    def grow(self, capacity):
+        # (Re)allocates the per-slot arrays for at least `capacity` products,
+        # keeping what is in them.
+        old = getattr(self, 'cov', np.zeros((0, 0)))
+        n = len(old)
+        if capacity <= n and n:
+            return
+        capacity = max(capacity, 2 * n, 1)
+        self.cov = np.zeros((capacity, capacity))
+        self.cov[:n, :n] = old
+        self.cov_step = np.zeros((capacity, capacity))
+        for name, dtype in (('mids', np.int64), ('last_mids', np.int64), ('changes', np.int64),
+                            ('vols', np.float64), ('inverse_vols', np.float64), ('risk_parity_qty', np.float64)):
+            vector = np.zeros(capacity, dtype=dtype)
+            if n:
+                vector[:n] = getattr(self, name)
+            setattr(self, name, vector)
+
+    def activate(self, product):
+        # Allocates a product's state from its config (or the template),
+        # first evicting the least recently seen symbol if that one wasn't
+        # seen this tick and max_products are live.
+        if self.max_products and len(self.product_params) >= self.max_products:
+            oldest, seen = next(iter(self.last_seen.items()))
+            if seen < self.ticks:
+                self.evict(oldest)
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = len(self.products)
+            self.products.append(None)
+            self.grow(slot + 1)
+        p = dict(self.product_config.get(product, self.template))
+        p['stats_tick'] = -1
+        p['ema_alpha'] = 2 / (p['window_size'] + 1)
+        p['ema_step'] = round(p['ema_alpha'] * (1 << VALUE_BITS))
+        p['kalman'] = None
+        p['kalman_gain'] = self.kalman_gain(p.get('kalman_q', 1.0), p.get('kalman_r', 1.0))
+        p['kalman_step'] = round(p['kalman_gain'] * (1 << VALUE_BITS))
+        if 'true_value' in p:
+            p['true_price'] = round(p['true_value'] * PRICE_SCALE)
+        p['cost'] = 0.0
+        p['fallback_bid'] = None
+        p['fallback_ask'] = None
+        # Price histories are ring buffers written twice (at i and i + HISTORY_SIZE)
+        # so the latest n prices are always one contiguous slice.
+        p['history'] = np.zeros(2 * HISTORY_SIZE, dtype=np.int64)
+        p['history_head'] = 0
+        p['history_len'] = 0
+        p['history_count'] = 0
+        p['cache_from'] = 0
+        strategies = p.get('arms', BANDIT_ARMS) if p['strategy'] == 'bandit' else (p['strategy'],)
+        if 'fair_price_mm' in strategies:
+            p['mm_ladder'] = self.quote_ladder(p)
+            p['mm_buckets'] = p.get('mm_vol_buckets', MM_DEFAULTS['mm_vol_buckets'])
+        self.product_params[product] = p
+        self.products[slot] = product
+        self.product_ids[product] = slot
+        self.degraded[product] = 0
+        self.quoted[product] = 0
+        self.last_seen[product] = self.ticks
+        self.priority_order = sorted(self.product_params,
+                                     key=lambda product: self.product_params[product].get('priority', 0))
+        return p
+
+    def evict(self, product):
+        slot = self.product_ids.pop(product)
+        del self.product_params[product]
+        del self.last_seen[product]
+        del self.degraded[product]
+        del self.quoted[product]
+        # Cached indicator rows are numbered from the symbol's first price.
+        self.indicator_cache.pop(product, None)
+        self.products[slot] = None
+        self.free_slots.append(slot)
+        self.cov[slot, :] = 0.0
+        self.cov[:, slot] = 0.0
+        self.mids[slot] = self.last_mids[slot] = self.risk_parity_qty[slot] = 0
+        self.priority_order.remove(product)
+
+    def discover(self, state):
+        # Allocates symbols seen for the first time, marks every symbol in the
+        # state as seen and evicts those idle for more than evict_after ticks.
+        last_seen = self.last_seen
+        for product in state.order_depths:
+            if product not in self.product_params:
+                self.activate(product)
+            last_seen[product] = self.ticks
+            last_seen.move_to_end(product)
+        if self.evict_after:
+            while last_seen:
+                product, seen = next(iter(last_seen.items()))
+                if self.ticks - seen <= self.evict_after:
+                    break
+                self.evict(product)
+
+    def warm_start(self, data):
+        if isinstance(data, dict):
+            self.restore(data)
+        else:
+            self.warm_up(data)
+        for p in self.product_params.values():
+            # The cached rows (indicator_cache.py) start from a cold history,
+            # so they only agree once the window holds none of the warm prices.
+            if p['history_len']:
+                p['cache_from'] = HISTORY_SIZE - 1
+            p['history_count'] = 0
+
+    def warm_up(self, rows):
+        # Steps the valuations, price histories and covariance through recorded
+        # mids without trading. Each mid becomes a one-lot book quoted around
+        # it, which every valuation reads back as that mid.
+        state = TradingState(0, {}, {})
+        for row in rows:
+            state.order_depths = {}
+            for product, mid in row.items():
+                if not mid:
+                    continue
+                depth = OrderDepth()
+                bid = int(mid - 0.5) if mid % 1 else int(mid) - 1
+                depth.buy_orders[bid] = 1
+                depth.sell_orders[int(2 * mid) - bid] = -1
+                state.order_depths[product] = depth
+                if product not in self.product_params:
+                    self.activate(product)
+            self.update_covariance(state)
+            for product, depth in state.order_depths.items():
+                self.update_value(product, depth)
+
+    def snapshot(self):
+        # Compact, JSON-serialisable indicator state for warm_start.
+        products = {}
+        for product, p in self.product_params.items():
+            products[product] = {
+                'history': self.price_history(product).tolist(),
+                'ema': p['ema'],
+                'kalman': p['kalman'],
+                'fallback': (p['fallback_bid'], p['fallback_ask']),
+                'mid': int(self.last_mids[self.product_ids[product]]),
+            }
+        slots = [self.product_ids[product] for product in products]
+        return {'products': products, 'cov': self.cov[np.ix_(slots, slots)].tolist(), 'cov_count': self.cov_count}
+
+    def restore(self, snapshot):
+        saved = snapshot['products']
+        for product, row in saved.items():
+            p = self.product_params.get(product) or self.activate(product)
+            for price in row['history'][-HISTORY_SIZE:]:
+                self.record_price(product, price)
+            p['ema'], p['kalman'] = row['ema'], row['kalman']
+            p['fallback_bid'], p['fallback_ask'] = row['fallback']
+            self.last_mids[self.product_ids[product]] = row['mid']
+        # Covariance entries by product, whatever slots they had before.
+        ids = [self.product_ids[product] for product in saved]
+        cov = np.array(snapshot['cov'])
+        for a, i in enumerate(ids):
+            for b, j in enumerate(ids):
+                self.cov[i, j] = cov[a, b]
+        self.cov_count = snapshot['cov_count']
+
+    def collect_garbage(self):
+        # Called between ticks (by the backtester, or at the end of run() live)
+        # while automatic collection is disabled.
+        self.ticks_since_gc += 1
+        if self.ticks_since_gc >= self.gc_interval:
+            gc.collect(0)
+            self.ticks_since_gc = 0
+
+    def record_price(self, product, price):
+        p = self.product_params[product]
+        head = p['history_head']
+        p['history'][head] = price
+        p['history'][head + HISTORY_SIZE] = price
+        p['history_head'] = head + 1 if head + 1 < HISTORY_SIZE else 0
+        if p['history_len'] < HISTORY_SIZE:
+            p['history_len'] += 1
+        p['history_count'] += 1
+
+    def price_history(self, product):
+        p = self.product_params[product]
+        end = p['history_head'] + HISTORY_SIZE if p['history_head'] else 2 * HISTORY_SIZE
+        return p['history'][end - p['history_len']:end]
+
+    def abs_changes(self, prices):
+        changes = self.scratch[:len(prices) - 1]
+        np.subtract(prices[1:], prices[:-1], out=changes)
+        np.abs(changes, out=changes)
+        return int(changes.sum())
+
+    def history_slope(self, product):
+        # Least-squares slope of the price history in ticks per tick, as
+        # (numerator, denominator).
+        n = self.product_params[product]['history_len']
+        cached = self.cached_indicators(product)
+        if cached is not None:
+            return int(cached[4]), self.slope_denom[n]
+        return int(np.dot(self.slope_x[n], self.price_history(product))), self.slope_denom[n]
+
+    def add_order(self, product, price, quantity, strategy_id=None):
+        if self.n_orders == len(self.orders):
+            self.orders = np.concatenate([self.orders, np.zeros(len(self.orders), dtype=ORDER_DTYPE)])
+        if strategy_id is None:
+            strategy_id = self.active_strategy_id
+        self.orders[self.n_orders] = (self.product_ids[product], price, quantity, strategy_id)
+        self.n_orders += 1
+
+    def update_covariance(self, state):
+        # Only slots up to the highest one in use: grow() doubles the
+        # capacity, and the spare slots past it would make every tick's
+        # update O(capacity ** 2) for nothing. Freed slots below it are zero.
+        n = len(self.products)
+        mids, last_mids, changes = self.mids[:n], self.last_mids[:n], self.changes[:n]
+        cov, cov_step = self.cov[:n, :n], self.cov_step[:n, :n]
+        for i, product in enumerate(self.products):
+            depth = state.order_depths.get(product)
+            if depth is not None and depth.buy_orders and depth.sell_orders:
+                mids[i] = max(depth.buy_orders) + min(depth.sell_orders)  # half-ticks
+            else:
+                mids[i] = last_mids[i]  # no quote: treat as unchanged
+
+        if not last_mids.all():
+            # Slots without a mid yet (no two-sided quote so far) take their
+            # first one as "no change" rather than a jump from zero.
+            np.copyto(last_mids, mids, where=last_mids == 0)
+        if self.cov_count:
+            np.subtract(mids, last_mids, out=changes)
+            np.multiply(changes[:, None], changes[None, :], out=cov_step)
+            cov_step *= (1 - self.cov_decay) / 4  # in ticks squared
+            cov *= self.cov_decay
+            cov += cov_step
+        last_mids[:] = mids
+        self.cov_count += 1
+
+        # Risk parity: each product gets lots inversely proportional to its own
+        # volatility, then the whole book is scaled so sqrt(w' C w) hits the
+        # portfolio risk budget, which accounts for the correlations.
+        vols, inverse_vols = self.vols[:n], self.inverse_vols[:n]
+        np.sqrt(np.diagonal(cov), out=vols)
+        np.divide(1.0, vols, out=inverse_vols, where=vols > 0)
+        inverse_vols[vols <= 0] = 0.0
+        portfolio_vol = np.dot(inverse_vols, np.dot(cov, inverse_vols)) ** 0.5
+        if portfolio_vol > 0:
+            np.multiply(inverse_vols, self.risk_budget / portfolio_vol, out=self.risk_parity_qty[:n])
+
+    def correlation(self):
+        vols = np.sqrt(np.diagonal(self.cov))
+        scale = np.outer(vols, vols)
+        return np.divide(self.cov, scale, out=np.zeros_like(self.cov), where=scale > 0)
+
+    def cached_indicators(self, product):
+        # The precomputed row for the latest price, if there is one and it
+        # was computed for this tick from the same price series.
+        series = self.indicator_cache.get(product)
+        if series is None:
+            return None
+        p = self.product_params[product]
+        i = p['history_count'] - 1
+        if i < p['cache_from']:
+            return None
+        if i >= len(series) or series[i, 5] != self.timestamp or series[i, 0] != p['history'][p['history_head'] - 1 + HISTORY_SIZE]:
+            # Out of step with the cache's ticks (a gap, extra ticks or other
+            # data): later rows can't line up either, so stop using it.
+            del self.indicator_cache[product]
+            return None
+        return series[i]
+
+    def history_stats(self, product):
+        # Count, sum, sum of squares and sum of absolute changes of the price
+        # history, as exact integers: mean = total / n, std = sqrt(n * squares
+        # - total ** 2) / n, ATR = moves / (n - 1). Computed once per tick
+        # however many strategies (live or shadow) read them.
+        p = self.product_params[product]
+        if p['stats_tick'] != self.ticks:
+            p['stats_tick'] = self.ticks
+            p['stats_n'] = n = p['history_len']
+            cached = self.cached_indicators(product)
+            if cached is not None:
+                p['stats_total'], p['stats_squares'], p['stats_moves'] = int(cached[1]), int(cached[2]), int(cached[3])
+                return n, p['stats_total'], p['stats_squares'], p['stats_moves']
+            prices = self.price_history(product)
+            p['stats_total'] = int(prices.sum())
+            p['stats_squares'] = int(np.dot(prices, prices))
+            p['stats_moves'] = self.abs_changes(prices) if n > 1 else 0
+        return p['stats_n'], p['stats_total'], p['stats_squares'], p['stats_moves']
+
+    def band_side(self, product, mid_price, k_num, k_den=1):
+        # -1 below mean - k * std, 1 above mean + k * std, else 0, for
+        # k = k_num / k_den; both sides are multiplied by n and squared.
+        n, total, squares, _ = self.history_stats(product)
+        offset = n * mid_price - total
+        if offset * offset * k_den * k_den <= (n * squares - total * total) * k_num * k_num:
+            return 0
+        return -1 if offset < 0 else 1
+
+    def recent_volatility(self, product):
+        # Std of the last window_size prices, in ticks.
+        recent = self.price_history(product)[-self.product_params[product]['window_size']:]
+        n = len(recent)
+        if not n:
+            return 0.0  # fallback to avoid std of an empty window
+        total = int(recent.sum())
+        return (n * int(np.dot(recent, recent)) - total * total) ** 0.5 / (n * PRICE_SCALE)
+
     def get_position_size(self, product, mid_price, confidence=None):
         p = self.product_params[product]
         sizing = p.get('position_sizing', 'fixed')
         max_position = p['max_position']
         base_qty = p.get('base_qty', 10)
 
-        # Compute volatility
-        price_history = list(p['price_history'])
-        volatility = np.std(price_history[-p['window_size']:] or [1])  # fallback to avoid zero std
-
         if sizing == 'fixed':
             return base_qty
 
+        elif sizing in ('vol_target', 'risk_parity'):
+            i = self.product_ids[product]
+            if self.cov_count < self.cov_warmup or self.vols[i] <= 0:
+                return base_qty
+            if sizing == 'vol_target':
+                qty = int(p.get('target_risk', base_qty) / self.vols[i])
+            else:
+                qty = int(self.risk_parity_qty[i])
+            return max(1, min(qty, max_position))
+
         elif sizing == 'volatility_adjusted':
+            volatility = self.recent_volatility(product)
             qty = int(base_qty / (1 + volatility))
             return max(1, min(qty, max_position))
 
@@ -84,6 +548,7 @@ class Trader:
                 return int(base_qty / 2)
 
         elif sizing == 'combined' and confidence is not None:
+            volatility = self.recent_volatility(product)
             vol_weight = 1 / (1 + volatility)
             conf_weight = 1 if confidence > 1 else 0.5
             qty = int(base_qty * vol_weight * conf_weight)
@@ -92,6 +557,7 @@ class Trader:
         else:
             return base_qty  # fallback
     def get_mid_price(self, product, order_depth):
+        # The product's value in 1/PRICE_SCALE ticks.
         params = self.product_params[product]
         strategy = params.get('valuation_strategy', 'ema')
 
@@ -100,179 +566,162 @@ class Trader:
         best_bid = max(bids) if bids else 0
         best_ask = min(asks) if asks else 0
 
-        mid_price = (best_bid + best_ask) / 2 if best_bid and best_ask else 0
+        mid_price = (best_bid + best_ask) * HALF_TICK if best_bid and best_ask else 0
 
         if strategy == 'true_value':
-            return params.get('true_value', mid_price)
+            return params.get('true_price', mid_price)
 
         elif strategy == 'mid':
             return mid_price
 
         elif strategy == 'vwap':
-            bid_prices = sorted(bids.keys(), reverse=True)
-            bid_volumes = [bids[p] for p in bid_prices]
-            ask_prices = sorted(asks.keys())
-            ask_volumes = [abs(asks[p]) for p in ask_prices]
-
-            vwap_bid = self.calculate_vwap(bid_prices, bid_volumes, best_bid)
-            vwap_ask = self.calculate_vwap(ask_prices, ask_volumes, best_ask)
-            return (vwap_bid + vwap_ask) / 2
+            bid_volume = sum(bids.values())
+            ask_volume = -sum(asks.values())
+            if not bid_volume or not ask_volume:
+                return mid_price
+            # bid VWAP + ask VWAP over two, rounded to the nearest price unit.
+            numerator = (sum(price * volume for price, volume in bids.items()) * ask_volume
+                         - sum(price * volume for price, volume in asks.items()) * bid_volume)
+            denominator = bid_volume * ask_volume
+            return (PRICE_SCALE * numerator + denominator) // (2 * denominator)
 
         elif strategy == 'ema':
-            if product=='KELP':
-                alpha = 2 / (params['window_size'] + 1)
-            elif product=='RAINFOREST_RESIN':
-                alpha = 2 / (params['window_size'] + 1)
-            elif product=="SQUID_INK":
-                alpha = 2 / (params['window_size'] + 1)
             if params.get('ema') is None:
-                params['ema'] = mid_price
+                params['ema'] = mid_price << VALUE_BITS
+            else:
+                params['ema'] += (params['ema_step'] * ((mid_price << VALUE_BITS) - params['ema'])) >> VALUE_BITS
+            return (params['ema'] + VALUE_ROUND) >> VALUE_BITS
+
+        elif strategy == 'kalman':
+            if not mid_price:
+                return (params['kalman'] + VALUE_ROUND) >> VALUE_BITS if params['kalman'] is not None else 0
+            if params['kalman'] is None:
+                params['kalman'] = mid_price << VALUE_BITS
             else:
-                params['ema'] = alpha * mid_price + (1 - alpha) * params['ema']
-            return params['ema']
+                params['kalman'] += (params['kalman_step'] * ((mid_price << VALUE_BITS) - params['kalman'])) >> VALUE_BITS
+            return (params['kalman'] + VALUE_ROUND) >> VALUE_BITS
 
         return mid_price  # fallback
 
+    def set_fallback(self, p, mid_price):
+        p['fallback_bid'] = (mid_price - PRICE_SCALE * p['fallback_spread']) // PRICE_SCALE
+        p['fallback_ask'] = mid_price // PRICE_SCALE + p['fallback_spread']
 
     def bollinger_strategy(self, product, mid_price, state):
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
-        if len(p['price_history']) < p['window_size']:
-            return []
-
-        prices = list(p['price_history'])
-        mean = np.mean(prices)
-        std = np.std(prices)
-        upper = mean + 2.01 * std
-        lower = mean - 2.01 * std
+        if p['history_len'] < p['window_size']:
+            return
 
-        #print(f"[{product}] Bollinger Bands: mean={mean:.2f}, upper={upper:.2f}, lower={lower:.2f}")
+        side = self.band_side(product, mid_price, 201, 100)  # mean -/+ 2.01 std
 
-        orders = []
         current_position = state.position.get(product, 0)
 
-        if mid_price < lower:
+        if side < 0:
             qty = self.get_position_size(product, mid_price,0.6)
             #print(f"[{product}] Bollinger Buy {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), qty))
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
 
-        elif mid_price > upper:
+        elif side > 0:
             qty = self.get_position_size(product, mid_price)
             #print(f"[{product}] Bollinger Sell {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), -qty))
-
-        return orders
+            self.add_order(product, mid_price // PRICE_SCALE, -qty)
 
     def breakout_strategy(self, product, mid_price, state):
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
-        if len(p['price_history']) < p['window_size']:
-            return []
+        if p['history_len'] < p['window_size']:
+            return
 
-        prices = list(p['price_history'])[:-1]
-        high = max(prices)
-        low = min(prices)
+        prices = self.price_history(product)[:-1]
+        high = prices.max()
+        low = prices.min()
 
-        #print(f"[{product}] Breakout: high={high:.2f}, low={low:.2f}, current={mid_price:.2f}")
+        #print(f"[{product}] Breakout: high={high}, low={low}, current={mid_price}")
 
-        orders = []
         current_position = state.position.get(product, 0)
 
         if mid_price > high:
             qty = self.get_position_size(product, mid_price)
             #print(f"[{product}] Breakout Buy {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), qty))
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
         elif mid_price < low:
             qty = min(10, p['max_position'] + current_position)
             #print(f"[{product}] Breakout Sell {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), -qty))
-
-        return orders
+            self.add_order(product, mid_price // PRICE_SCALE, -qty)
 
     def moving_average_strategy(self, product, mid_price, state):
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
-        if len(p['price_history']) < p['window_size']:
-            return []
+        if p['history_len'] < p['window_size']:
+            return
 
-        avg = np.mean(p['price_history'])
+        n, total, squares, moves = self.history_stats(product)
+        offset = n * mid_price - total  # n * (mid - mean)
 
-        ##print(f"[{product}] Moving Average: mean={avg:.2f}, current={mid_price:.2f}")
+        ##print(f"[{product}] Moving Average: mean={total / n:.2f}, current={mid_price}")
 
-        orders = []
         current_position = state.position.get(product, 0)
 
-        if mid_price > avg:
+        if offset > 0:
             qty = self.get_position_size(product, mid_price)
             ##print(f"[{product}] MA Buy {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), qty))
-        elif mid_price < avg:
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
+        elif offset < 0:
             qty = min(10, p['max_position'] + current_position)
             ##print(f"[{product}] MA Sell {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), -qty))
-
-        return orders
+            self.add_order(product, mid_price // PRICE_SCALE, -qty)
 
     def zscore_strategy(self, product, mid_price, state):
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
-        if len(p['price_history']) < p['window_size']:
-            return []
+        if p['history_len'] < p['window_size']:
+            return
 
-        mean = np.mean(p['price_history'])
-        std = np.std(p['price_history'])
-        z = (mid_price - mean) / std if std else 0
-        #print(f"[{product}] Z-Score: {z:.2f}")
+        n, total, squares, moves = self.history_stats(product)
+        # |z| > 1, with z = 0 for a flat history.
+        z_side = self.band_side(product, mid_price, 1) if n * squares > total * total else 0
 
-        orders = []
         current_position = state.position.get(product, 0)
 
-        if z < -1:
+        if z_side < 0:
             qty = self.get_position_size(product, mid_price)
             #print(f"[{product}] Z-Score Buy {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), qty))
-        elif z > 1:
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
+        elif z_side > 0:
             qty = min(10, p['max_position'] + current_position)
             #print(f"[{product}] Z-Score Sell {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), -qty))
-
-        return orders
+            self.add_order(product, mid_price // PRICE_SCALE, -qty)
 
     def crossover_strategy(self, product, mid_price, state):
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
-        if len(p['price_history']) < 7:
-            return []
+        if p['history_len'] < 7:
+            return
 
-        short = np.mean(list(p['price_history'])[-3:])
-        long = np.mean(list(p['price_history'])[-7:])
-        #print(f"[{product}] Crossover: short={short:.2f}, long={long:.2f}")
+        prices = self.price_history(product)
+        # Means of the last 3 and 7 prices, both scaled by 21.
+        short = 7 * int(prices[-3:].sum())
+        long = 3 * int(prices[-7:].sum())
+        #print(f"[{product}] Crossover: short={short / 21:.2f}, long={long / 21:.2f}")
 
-        orders = []
         current_position = state.position.get(product, 0)
 
         if short > long:
             qty = self.get_position_size(product, mid_price)
             #print(f"[{product}] Crossover Buy {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), qty))
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
         elif short < long:
             qty = min(10, p['max_position'] + current_position)
             #print(f"[{product}] Crossover Sell {qty} at {mid_price}")
-            orders.append(Order(product, int(mid_price), -qty))
-
-        return orders
+            self.add_order(product, mid_price // PRICE_SCALE, -qty)
 
     def momentum_strategy(self, product, mid_price, state):
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
 
-        if len(p['price_history']) < 4:
-            return []
+        if p['history_len'] < 4:
+            return
 
-        changes = [p['price_history'][i] - p['price_history'][i - 1] for i in range(1, len(p['price_history']))]
-        #print(f"[{product}] Momentum changes: {changes[-4:]}")
+        prices = self.price_history(product)
+        last_change = prices[-1] - prices[-2]
+        prev_change = prices[-2] - prices[-3]
+        #print(f"[{product}] Momentum changes: {prices[-5:]}")
 
-        orders = []
         current_position = state.position.get(product, 0)
 
         # Initialize buy price if not already done
@@ -280,50 +729,81 @@ class Trader:
             p['buy_price'] = None
 
         # Buy logic: upward momentum and we aren't max long yet
-        if changes[-1] > 0 and changes[-2] > 0 and current_position < p['max_position']:
+        if last_change > 0 and prev_change > 0 and current_position < p['max_position']:
             qty = self.get_position_size(product, mid_price)
-            orders.append(Order(product, int(mid_price), qty))
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
             p['buy_price'] = mid_price
             #print(f"[{product}] Momentum BUY {qty} @ {mid_price}")
 
-        # Sell logic: 3 consecutive drops or triggered stop-loss
-        elif (all(c < 0 for c in changes[-3:]) or
-            (p['buy_price'] and mid_price < 0.8 * p['buy_price'])) and current_position > 0:
+        # Sell logic: 3 consecutive drops or triggered stop-loss (below 80% of the buy price)
+        elif ((last_change < 0 and prev_change < 0 and prices[-3] < prices[-4]) or
+            (p['buy_price'] and 5 * mid_price < 4 * p['buy_price'])) and current_position > 0:
             qty = current_position  # Sell all current long
-            orders.append(Order(product, int(mid_price), -qty))
+            self.add_order(product, mid_price // PRICE_SCALE, -qty)
             #print(f"[{product}] Momentum SELL {qty} @ {mid_price}")
             p['buy_price'] = None
 
-        return orders
-
-
-    def fair_price_mm_strategy(self, product, order_depth, state):
-        best_bid = max(order_depth.buy_orders.keys(), default=0)
-        best_ask = min(order_depth.sell_orders.keys(), default=0)
-        if best_bid == 0 or best_ask == 0:
-            return []
 
-        fair_price = (best_bid + best_ask) / 2
-        #print(f"[{product}] Fair Price MM: best_bid={best_bid}, best_ask={best_ask}, fair_price={fair_price}")
-
-        orders = []
-        current_position = state.position.get(product, 0)
-        max_position = self.product_params[product]['max_position']
-
-        buy_qty = min(10, max_position - current_position)
-        sell_qty = min(10, max_position + current_position)
-
-        orders.append(Order(product, int(fair_price - 1), buy_qty))
-        orders.append(Order(product, int(fair_price + 1), -sell_qty))
-
-        #print(f"[{product}] Market Making Buy {buy_qty} at {int(fair_price - 1)}")
-        #print(f"[{product}] Market Making Sell {sell_qty} at {int(fair_price + 1)}")
-        return orders
+    def quote_ladder(self, p):
+        # Every quote fair_price_mm can send, precomputed per position
+        # (-max_position..max_position) and volatility bucket as
+        # ((price offset in ticks, quantity), ...), bids from the tick at or
+        # below the fair value and asks from the one at or above it.
+        # Quotes sit mm_spread ticks either side of the fair value, plus
+        # mm_widen per volatility bucket, mm_step apart, and shift down by up
+        # to mm_skew ticks when long (up when short). The shift is capped at
+        # the half spread, so the inner quotes reach the fair value at most
+        # and never cross it. The side that adds to the position shrinks
+        # with it, and each side's total stays within the position limit so
+        # the exchange never rejects the ladder.
+        mm = {key: p.get(key, value) for key, value in MM_DEFAULTS.items()}
+        max_position = p['max_position']
+        ladder = []
+        for position in range(-max_position, max_position + 1):
+            shift = round(mm['mm_skew'] * position / max_position) if max_position else 0
+            buy_size = round(mm['mm_size'] * min(1, (max_position - position) / max_position)) if max_position else 0
+            sell_size = round(mm['mm_size'] * min(1, (max_position + position) / max_position)) if max_position else 0
+            buckets = []
+            for bucket in range(len(mm['mm_vol_buckets']) + 1):
+                half_spread = mm['mm_spread'] + bucket * mm['mm_widen']
+                skew = min(max(shift, -half_spread), half_spread)
+                quotes = []
+                buy_room, sell_room = max_position - position, max_position + position
+                for level in range(mm['mm_levels']):
+                    buy, sell = min(buy_size, buy_room), min(sell_size, sell_room)
+                    buy_room -= buy
+                    sell_room -= sell
+                    if buy > 0:
+                        quotes.append((-half_spread - skew - level * mm['mm_step'], buy))
+                    if sell > 0:
+                        quotes.append((half_spread - skew + level * mm['mm_step'], -sell))
+                buckets.append(tuple(quotes))
+            ladder.append(tuple(buckets))
+        return tuple(ladder)
+
+    def fair_price_mm_strategy(self, product, mid_price, state):
+        # One table lookup per tick: the product's position and volatility
+        # bucket (EWMA per-tick std, see update_covariance) pick its ladder.
+        if not mid_price:
+            return
+        p = self.product_params[product]
+        if 'mm_ladder' not in p:
+            p['mm_ladder'] = self.quote_ladder(p)
+            p['mm_buckets'] = p.get('mm_vol_buckets', MM_DEFAULTS['mm_vol_buckets'])
+        max_position = p['max_position']
+        position = min(max(state.position.get(product, 0), -max_position), max_position)
+        bucket = 0
+        if self.cov_count >= self.cov_warmup:
+            bucket = bisect_right(p['mm_buckets'], self.vols[self.product_ids[product]])
+        # The fair value to the nearest half-tick, and the ticks either side
+        # of it (the same tick when it is whole).
+        fair = (mid_price + HALF_TICK // 2) // HALF_TICK
+        bid_tick, ask_tick = fair // 2, (fair + 1) // 2
+        for offset, quantity in p['mm_ladder'][position + max_position][bucket]:
+            self.add_order(product, (bid_tick if quantity > 0 else ask_tick) + offset, quantity)
 
     def trend_follow_sl_strategy(self, product, mid_price, state):
-        import numpy as np
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
 
         if 'cooldown' not in p:
             p['cooldown'] = 0
@@ -333,52 +813,45 @@ class Trader:
         if p['cooldown'] > 0:
             #print(f"[{product}] In cooldown: {p['cooldown']} ticks remaining")
             p['cooldown'] -= 1
-            return []
+            return
 
-        if len(p['price_history']) < p['window_size']:
-            return []
+        if p['history_len'] < p['window_size']:
+            return
 
-        prices = list(p['price_history'])
-        returns = np.diff(prices)
-        x = np.arange(len(prices))
-        slope = np.polyfit(x, prices, 1)[0]
-        atr = np.mean(np.abs(returns))
+        rise, run = self.history_slope(product)
+        n, total, squares, moves = self.history_stats(product)
+        # 1.5 ATR in price units, rounded up so the stop never sits closer than that.
+        stop_distance = -(-3 * moves // (2 * (n - 1))) if n > 1 else 0
 
-        #print(f"[{product}] Trend slope: {slope:.4f}, ATR: {atr:.2f}")
+        #print(f"[{product}] Trend slope: {rise / run:.4f}, stop distance: {stop_distance}")
 
-        orders = []
         current_position = state.position.get(product, 0)
 
-        # Entry condition
-        if slope > 0.2 and current_position <= 0:
+        # Entry condition: slope above 0.2 ticks per tick
+        if 5 * rise > run and current_position <= 0:
             qty = self.get_position_size(product, mid_price)
-            orders.append(Order(product, int(mid_price), qty))
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
             p['buy_price'] = mid_price
-            p['trailing_stop'] = mid_price - 1.5 * atr
-            #print(f"[{product}] Buy {qty} @ {mid_price}, Trail Stop @ {p['trailing_stop']:.2f}")
+            p['trailing_stop'] = mid_price - stop_distance
+            #print(f"[{product}] Buy {qty} @ {mid_price}, Trail Stop @ {p['trailing_stop']}")
 
         # Exit logic if in position
         if p.get('buy_price') and current_position > 0:
             # Update trailing stop
-            new_trailing = mid_price - 1.5 * atr
+            new_trailing = mid_price - stop_distance
             if new_trailing > p['trailing_stop']:
                 p['trailing_stop'] = new_trailing
-                #print(f"[{product}] Trailing stop updated to {p['trailing_stop']:.2f}")
+                #print(f"[{product}] Trailing stop updated to {p['trailing_stop']}")
 
             # Stop-loss or take-profit
             if mid_price < p['trailing_stop']:
                 qty = current_position
-                orders.append(Order(product, int(mid_price), -qty))
+                self.add_order(product, mid_price // PRICE_SCALE, -qty)
                 #print(f"[{product}] TRAILING STOP SELL {qty} @ {mid_price}")
                 p['buy_price'] = None
                 p['trailing_stop'] = None
                 p['cooldown'] = 5  # wait 5 ticks before re-entering
-
-        return orders
-
-        return orders
     def orderbook_imbalance_strategy(self, product, order_depth, state):
-        orders = []
         bids = order_depth.buy_orders
         asks = order_depth.sell_orders
         best_bid = max(bids.keys(), default=0)
@@ -394,77 +867,226 @@ class Trader:
 
         if imbalance > 0.3:
             volume = min(max_position - current_position, 10)
-            orders.append(Order(product, best_ask, volume))
+            self.add_order(product, best_ask, volume)
             #print(f"[{product}] Buying {volume} at {best_ask} due to OB imbalance")
         elif imbalance < -0.3:
             volume = min(max_position + current_position, 10)
-            orders.append(Order(product, best_bid, -volume))
+            self.add_order(product, best_bid, -volume)
             #print(f"[{product}] Selling {volume} at {best_bid} due to OB imbalance")
 
-        return orders
-
     def keltner_channel_strategy(self, product, mid_price, state):
         p = self.product_params[product]
-        p['price_history'].append(mid_price)
-        if len(p['price_history']) < 10:
-            return []
+        if p['history_len'] < 10:
+            return
 
-        ema = sum(p['price_history']) / len(p['price_history'])
-        atr = sum(abs(p['price_history'][i] - p['price_history'][i - 1]) for i in range(1, len(p['price_history']))) / (len(p['price_history']) - 1)
-        upper_band = ema + 1.5 * atr
-        lower_band = ema - 1.5 * atr
+        n, total, squares, moves = self.history_stats(product)
+        # mid against mean -/+ 1.5 ATR, everything scaled by 2 * n * (n - 1).
+        offset = 2 * (n - 1) * (n * mid_price - total)
+        band = 3 * n * moves
 
-        #print(f"[{product}] Keltner Channel: EMA={ema:.2f}, ATR={atr:.2f}, Upper={upper_band:.2f}, Lower={lower_band:.2f}")
+        #print(f"[{product}] Keltner Channel: mean={total / n:.2f}, ATR={moves / (n - 1):.2f}")
 
-        orders = []
         current_position = state.position.get(product, 0)
         max_position = p['max_position']
 
-        if mid_price < lower_band:
+        if offset < -band:
             qty = min(10, max_position - current_position)
-            orders.append(Order(product, int(mid_price), qty))
+            self.add_order(product, mid_price // PRICE_SCALE, qty)
             #print(f"[{product}] Buy {qty} at {mid_price} (Below Keltner Lower Band)")
-        elif mid_price > upper_band:
+        elif offset > band:
             qty = min(10, max_position + current_position)
-            orders.append(Order(product, int(mid_price), -qty))
+            self.add_order(product, mid_price // PRICE_SCALE, -qty)
             #print(f"[{product}] Sell {qty} at {mid_price} (Above Keltner Upper Band)")
+    def update_value(self, product, order_depth):
+        p = self.product_params[product]
+        mid_price = self.get_mid_price(product, order_depth)
+        self.record_price(product, mid_price)
+        if mid_price:
+            self.set_fallback(p, mid_price)
+        return mid_price
+
+    def run_strategy(self, product, mid_price, order_depth, state):
+        strategy = self.product_params[product]['strategy']
+        #print(f"\n=== {product} @ {mid_price:.2f} using {strategy} strategy ===")
+
+        if strategy == 'bandit':
+            self.bandit_strategy(product, mid_price, order_depth, state)
+        else:
+            self.dispatch(strategy, product, mid_price, order_depth, state)
+
+    def dispatch(self, strategy, product, mid_price, order_depth, state):
+        self.active_strategy_id = STRATEGY_IDS.get(strategy, -1)
+        if strategy == 'zscore':
+            self.zscore_strategy(product, mid_price, state)
+        elif strategy == 'crossover':
+            self.crossover_strategy(product, mid_price, state)
+        elif strategy == 'momentum':
+            self.momentum_strategy(product, mid_price, state)
+        elif strategy == 'bollinger':
+            self.bollinger_strategy(product, mid_price, state)
+        elif strategy == 'breakout':
+            self.breakout_strategy(product, mid_price, state)
+        elif strategy == 'moving_average':
+            self.moving_average_strategy(product, mid_price, state)
+        elif strategy == 'fair_price_mm':
+            self.fair_price_mm_strategy(product, mid_price, state)
+        elif strategy == 'trend_follow_sl':
+            self.trend_follow_sl_strategy(product, mid_price, state)
+        elif strategy == 'orderbook_imbalance':
+            self.orderbook_imbalance_strategy(product, order_depth, state)
+        elif strategy == 'keltner_channel':
+            self.keltner_channel_strategy(product, mid_price, state)
+
+    def new_bandit(self, p):
+        arms = p.get('arms', BANDIT_ARMS)
+        k = len(arms)
+        return {
+            'arms': arms,
+            'states': [{'buy_price': None, 'cooldown': 0, 'trailing_stop': None} for _ in arms],
+            'position': [0] * k,
+            'cash': [0.0] * k,
+            'mtm': [0.0] * k,
+            'mean': [0.0] * k,
+            'var': [0.0] * k,
+            'pulls': [0] * k,
+            'ticks': 0,
+            'live': 0,
+        }
 
-        return orders
+    def bandit_strategy(self, product, mid_price, order_depth, state):
+        # Every arm runs each tick: the live one against the real position and
+        # the rest in shadow against their own simulated position, with their
+        # orders taken back out of the buffer. An arm's order counts as filled
+        # at the touch when it crosses the current book (within max_position),
+        # as the backtester would fill it, and the arm is marked to market at
+        # the mid. Thompson sampling over the discounted per-tick PnL picks
+        # the next live arm.
+        # The arms are few, so the bookkeeping is plain lists rather than
+        # NumPy, whose per-call overhead dominates at this size.
+        p = self.product_params[product]
+        if 'bandit' not in p:
+            p['bandit'] = self.new_bandit(p)
+        bandit = p['bandit']
+        mark = self.mids[self.product_ids[product]] / 2
+        best_bid = max(order_depth.buy_orders) if order_depth.buy_orders else None
+        best_ask = min(order_depth.sell_orders) if order_depth.sell_orders else None
+        cash, position, mtm, mean, var = bandit['cash'], bandit['position'], bandit['mtm'], bandit['mean'], bandit['var']
+        decay = self.bandit_decay
+        first = bandit['ticks'] == 0
+        bandit['ticks'] += 1
+        effective_ticks = min(bandit['ticks'], 1 / (1 - decay))
+
+        live = 0
+        best = None
+        for k in range(len(mtm)):
+            value = cash[k] + position[k] * mark
+            if not first:
+                delta = value - mtm[k] - mean[k]
+                mean[k] += (1 - decay) * delta
+                var[k] = decay * (var[k] + (1 - decay) * delta * delta)
+            mtm[k] = value
+            self.normal_index = (self.normal_index + 1) & 4095
+            sample = mean[k] + (var[k] / effective_ticks) ** 0.5 * self.normals[self.normal_index]
+            if best is None or sample > best:
+                live, best = k, sample
+        bandit['live'] = live
+        bandit['pulls'][live] += 1
 
-        return orders
-    def run(self, state: TradingState):
-        result = {}
-        for product, order_depth in state.order_depths.items():
-            if product not in self.product_params:
+        max_position = p['max_position']
+        for k, strategy in enumerate(bandit['arms']):
+            arm_state = bandit['states'][k]
+            stateful = STRATEGY_STATE.get(strategy, ())
+            for key in stateful:
+                p[key] = arm_state[key]
+            if k == live:
+                arm_view = state
+            else:
+                self.shadow_state.position[product] = position[k]
+                arm_view = self.shadow_state
+            start = self.n_orders
+            self.dispatch(strategy, product, mid_price, order_depth, arm_view)
+            for key in stateful:
+                arm_state[key] = p[key]
+
+            if self.n_orders > start:
+                quantities = self.orders['quantity']
+                prices = self.orders['price']
+                for i in range(start, self.n_orders):
+                    quantity = int(quantities[i])
+                    if quantity > 0 and best_ask is not None and prices[i] >= best_ask:
+                        quantity = min(quantity, max_position - position[k])
+                        cash[k] -= quantity * best_ask
+                    elif quantity < 0 and best_bid is not None and prices[i] <= best_bid:
+                        quantity = max(quantity, -max_position - position[k])
+                        cash[k] -= quantity * best_bid
+                    else:
+                        continue
+                    position[k] += quantity
+            if k != live:
+                self.n_orders = start
+
+    def bandit_report(self):
+        return {product: {strategy: (p['bandit']['pulls'][k], p['bandit']['mtm'][k])
+                          for k, strategy in enumerate(p['bandit']['arms'])}
+                for product, p in self.product_params.items() if 'bandit' in p}
+
+    def fallback_quote(self, product, state):
+        p = self.product_params[product]
+        if p['fallback_bid'] is None:
+            return
+        current_position = state.position.get(product, 0)
+        buy_qty = min(p['base_qty'], p['max_position'] - current_position)
+        sell_qty = min(p['base_qty'], p['max_position'] + current_position)
+        fallback_id = STRATEGY_IDS['fallback_quote']
+        if buy_qty > 0:
+            self.add_order(product, p['fallback_bid'], buy_qty, fallback_id)
+        if sell_qty > 0:
+            self.add_order(product, p['fallback_ask'], -sell_qty, fallback_id)
+
+    def run_columnar(self, state: TradingState):
+        clock = self.clock
+        start = clock()
+        self.n_orders = 0
+        self.ticks += 1
+        self.timestamp = state.timestamp
+        self.discover(state)
+        self.update_covariance(state)
+        for product in self.priority_order:
+            order_depth = state.order_depths.get(product)
+            if order_depth is None:
+                continue
+            p = self.product_params[product]
+            self.quoted[product] += 1
+            mid_price = self.update_value(product, order_depth)
+            began = clock()
+            if began - start + p['cost'] > self.time_budget:
+                self.degraded[product] += 1
+                self.fallback_quote(product, state)
+                # Forget the estimate on skipped ticks too, or one slow tick
+                # would keep the product on its fallback quote for good.
+                p['cost'] *= 0.8
                 continue
+            self.run_strategy(product, mid_price, order_depth, state)
+            p['cost'] = 0.8 * p['cost'] + 0.2 * (clock() - began)
 
-            strategy = self.product_params[product]['strategy']
-            mid_price = self.get_mid_price(product, order_depth)
-            #print(f"\n=== {product} @ {mid_price:.2f} using {strategy} strategy ===")
-
-            if strategy == 'zscore':
-                result[product] = self.zscore_strategy(product, mid_price, state)
-            elif strategy == 'crossover':
-                result[product] = self.crossover_strategy(product, mid_price, state)
-            elif strategy == 'momentum':
-                result[product] = self.momentum_strategy(product, mid_price, state)
-            elif strategy == 'bollinger':
-                result[product] = self.bollinger_strategy(product, mid_price, state)
-            elif strategy == 'breakout':
-                result[product] = self.breakout_strategy(product, mid_price, state)
-            elif strategy == 'moving_average':
-                result[product] = self.moving_average_strategy(product, mid_price, state)
-            elif strategy == 'fair_price_mm':
-                result[product] = self.fair_price_mm_strategy(product, order_depth, state)
-            elif strategy == 'trend_follow_sl':
-                result[product] = self.trend_follow_sl_strategy(product, mid_price, state)
-            elif strategy == 'orderbook_imbalance':
-                result[product] = self.orderbook_imbalance_strategy(product, order_depth, state)
-            elif strategy == 'keltner_channel':
-                result[product] = self.keltner_channel_strategy(product, mid_price, state)
-            elif strategy == 'trend_follow_sl':
-                result[product] = self.trend_follow_sl_strategy(product, mid_price, state)
-            else:
-                result[product] = []
+        return self.orders[:self.n_orders], 0, TRADER_DATA
 
-        return result, 0, json.dumps({})
+    def degradation_report(self):
+        # {product: (degraded ticks, share of the ticks it was quoted on)}
+        return {product: (count, count / self.quoted[product] if self.quoted[product] else 0.0)
+                for product, count in self.degraded.items()}
+
+    def orders_to_dict(self, orders, state):
+        result = {product: [] for product in state.order_depths if product in self.product_params}
+        for product_id, price, quantity in zip(orders['product'].tolist(), orders['price'].tolist(),
+                                               orders['quantity'].tolist()):
+            product = self.products[product_id]
+            result[product].append(Order(product, price, quantity))
+        return result
+
+    def run(self, state: TradingState):
+        orders, conversions, trader_data = self.run_columnar(state)
+        result = self.orders_to_dict(orders, state)
+        if self.gc_between_ticks:
+            self.collect_garbage()
+        return result, conversions, trader_data
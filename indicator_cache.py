@@ -0,0 +1,112 @@
+import copy
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from result_cache import data_fingerprint, file_hash, product_ticks
+
+# Shared indicator series for sweeps. Hundreds of configurations of the same
+# Trader usually value a product the same way, so they see the same price
+# series and the same rolling mean/std/ATR/slope. Each distinct series is
+# computed once per data segment with NumPy, saved as a .npy file and
+# memory-mapped by every process that needs it; the Trader reads its
+# indicators from the mapped rows (Trader.indicator_cache) instead of
+# recomputing them every tick.
+#
+# Rows are (mid, sum, sum of squares, sum of absolute changes, slope
+# numerator, timestamp) per recorded price, exact int64 in the Trader's
+# price units, over the trailing HISTORY_SIZE prices the strategies use.
+# window_size only gates warm-up there, so it doesn't split the cache unless
+# it also sets the EMA valuation's alpha; the one per-window indicator (the
+# window_size std) isn't cached. The timestamp numbers the rows, so the
+# Trader can tell a row is for the tick it's on and not just the same price.
+
+COLUMNS = ('mid', 'total', 'squares', 'moves', 'slope', 'timestamp')
+VALUATION_KEYS = ('valuation_strategy', 'true_value', 'ema_alpha', 'kalman_gain')
+
+
+def rolling_indicators(mids, window, timestamps):
+    n = len(mids)
+    series = np.zeros((n, len(COLUMNS)), dtype=np.int64)
+    series[:, 0] = mids
+    series[:, 5] = timestamps
+    # Partial windows during warm-up, one at a time; the rest in one pass.
+    for i in range(min(n, window - 1)):
+        prices = mids[:i + 1]
+        series[i, 1] = prices.sum()
+        series[i, 2] = np.dot(prices, prices)
+        series[i, 3] = np.abs(np.diff(prices)).sum()
+        series[i, 4] = np.dot(2 * np.arange(i + 1) - i, prices)
+    if n >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(mids, window)
+        series[window - 1:, 1] = windows.sum(axis=1)
+        series[window - 1:, 2] = (windows * windows).sum(axis=1)
+        series[window - 1:, 3] = np.abs(np.diff(windows, axis=1)).sum(axis=1)
+        series[window - 1:, 4] = windows @ (2 * np.arange(window) - (window - 1))
+    return series
+
+
+def valuation_params(trader, product):
+    p = trader.product_params[product]
+    return {key: p.get(key) for key in VALUATION_KEYS}
+
+
+class IndicatorCache:
+    def __init__(self, directory='indicator_cache'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.mapped = {}
+        self.fingerprints = {}
+        self.code_hashes = {}
+        self.computed = 0
+
+    def fingerprint(self, ticks, product):
+        # Hashing the data is O(ticks); do it once per segment, not per configuration.
+        key = (id(ticks), product)
+        if key not in self.fingerprints:
+            self.fingerprints[key] = (ticks, data_fingerprint(ticks, product))
+        return self.fingerprints[key][1]
+
+    def code_hash(self, trader_class):
+        # load_trader doesn't register the module, so find the file via the code.
+        path = trader_class.get_mid_price.__code__.co_filename
+        if path not in self.code_hashes:
+            self.code_hashes[path] = file_hash(path)
+        return self.code_hashes[path]
+
+    def series(self, trader, ticks, product):
+        window = len(trader.scratch)
+        key_source = json.dumps([self.code_hash(type(trader)), COLUMNS, product, window, valuation_params(trader, product),
+                                 self.fingerprint(ticks, product)], sort_keys=True, default=str)
+        key = hashlib.sha256(key_source.encode()).hexdigest()
+        if key in self.mapped:
+            return self.mapped[key]
+        path = os.path.join(self.directory, key + '.npy')
+        if not os.path.exists(path):
+            # The valuation (EMA, Kalman) is stateful, so the mids come from a
+            # copy of the not-yet-run trader stepping through the segment.
+            valuer = copy.deepcopy(trader)
+            rows = product_ticks(ticks, product)
+            mids = np.array([valuer.get_mid_price(product, depths[product]) for _, depths in rows], dtype=np.int64)
+            timestamps = np.array([timestamp for timestamp, _ in rows], dtype=np.int64)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, rolling_indicators(mids, window, timestamps))
+            os.replace(tmp, path)
+            self.computed += 1
+        self.mapped[key] = np.load(path, mmap_mode='r')
+        return self.mapped[key]
+
+    def attach(self, trader, ticks, products=None):
+        # Call before the trader's first tick on `ticks`; rows are matched to
+        # the trader's own price count, and a product whose tick or price
+        # disagrees with its row drops its cache for good.
+        if not hasattr(trader, 'indicator_cache'):
+            return trader
+        for product in products or list(trader.product_params):
+            # Symbols a Trader only allocates on first sight get no cached rows.
+            if product in trader.product_params and any(product in depths for _, depths in ticks):
+                trader.indicator_cache[product] = self.series(trader, ticks, product)
+        return trader
@@ -0,0 +1,175 @@
+import argparse
+import contextlib
+import heapq
+import os
+import time
+
+import numpy as np
+
+from backtester import Backtester, load_trader, orders_to_array, read_prices, read_trades
+
+# Latency-aware replay. Orders returned by the Trader only reach the book a
+# delay after the tick they were decided on, by which time the book may have
+# moved: they wait in an event queue keyed by arrival time and are matched
+# against the latest book at or before that time, so a delay of at least one
+# tick interval fills against the next snapshot. Sampled delays can reorder
+# arrivals, which the queue handles; batches arriving against the same
+# snapshot share one depleted copy of it, so liquidity taken by an earlier
+# arrival is gone for the later ones. Fills made in flight reach the Trader
+# as own_trades on its next tick. With zero delay this is the Backtester.
+#
+# Delays are in timestamp units (100 per tick in the exchange data). The
+# report backtests the same data over increasing delays and fits how PnL
+# decays with delay; given --units-per-second it converts that into PnL per
+# microsecond of run() latency.
+#
+#   python latency.py harshcheepak2.py prices.csv --delays 0 100 200 500 1000
+#   python latency.py 7-5-2025.py prices.csv trades.csv --jitter 50 --units-per-second 1e6
+
+
+def fixed_delay(delay):
+    return lambda run_seconds: delay
+
+
+def exponential_delay(mean, base=0, seed=0):
+    # base plus an exponentially distributed wait, drawn per tick.
+    rng = np.random.default_rng(seed)
+    return lambda run_seconds: base + rng.exponential(mean) if mean else base
+
+
+def sampled_delay(samples, seed=0):
+    # Draws each tick's delay from observed delays (e.g. measured round trips).
+    rng = np.random.default_rng(seed)
+    samples = np.asarray(samples)
+    return lambda run_seconds: samples[rng.integers(len(samples))]
+
+
+def run_time_delay(units_per_second, base=0):
+    # The Trader's own measured run() time, converted to timestamp units.
+    return lambda run_seconds: base + run_seconds * units_per_second
+
+
+def combined_delay(*delays):
+    # Sum of independent delays, e.g. network jitter plus run() time.
+    return lambda run_seconds: sum(delay(run_seconds) for delay in delays)
+
+
+class LatencyBacktester(Backtester):
+    def __init__(self, trader, delay=0, position_limits=None, default_limit=50, record_orders=False):
+        # delay: timestamp units, or a callable taking the tick's run() time
+        # in seconds and returning its delay (see the *_delay helpers).
+        super().__init__(trader, position_limits, default_limit, record_orders)
+        self.delay = delay if callable(delay) else fixed_delay(delay)
+        self.queue = []  # (arrival, sequence, orders, products)
+        self.sent = 0
+        self.book = {}
+        self.books = {}  # what is left of self.book after this snapshot's arrivals
+        self.delays = []
+        self.run_seconds = []
+
+    def deliver(self, until, inclusive=True):
+        # Matches every queued batch arriving by `until` against the current book.
+        queue = self.queue
+        while queue and (queue[0][0] <= until if inclusive else queue[0][0] < until):
+            arrival, _, orders, products = heapq.heappop(queue)
+            self.match(arrival, self.book, orders, products, self.books)
+
+    def step(self, timestamp, order_depths, market_trades=None):
+        # Arrivals before this tick saw the previous book.
+        self.deliver(timestamp, inclusive=False)
+        self.book = order_depths
+        self.books = {}
+        for product in order_depths:
+            self.product_id(product)
+        state = self.make_state(timestamp, order_depths, market_trades)
+        self.own_trades = {}
+
+        began = time.perf_counter()
+        if hasattr(self.trader, 'run_columnar'):
+            orders, conversions, trader_data = self.trader.run_columnar(state)
+            # The Trader reuses its order buffer and product slots next tick.
+            orders, products = orders.copy(), list(self.trader.products)
+        else:
+            result, conversions, trader_data = self.trader.run(state)
+            orders, products = orders_to_array(result, self.product_ids), self.products
+        run_seconds = time.perf_counter() - began
+        self.trader_data = trader_data if isinstance(trader_data, str) else ''
+        if self.order_log is not None:
+            self.log_orders(timestamp, orders, products)
+
+        delay = max(0, int(round(self.delay(run_seconds))))
+        self.delays.append(delay)
+        self.run_seconds.append(run_seconds)
+        if len(orders):
+            heapq.heappush(self.queue, (timestamp + delay, self.sent, orders, products))
+            self.sent += 1
+        self.deliver(timestamp)
+
+        for product, depth in order_depths.items():
+            if depth.buy_orders and depth.sell_orders:
+                self.last_mid[product] = (max(depth.buy_orders) + min(depth.sell_orders)) / 2
+
+
+def latency_decay(trader_class, ticks, delays, market_trades=None, make_delay=fixed_delay):
+    # One backtest per delay: [(delay, {product: pnl}, fills, mean run() seconds)].
+    rows = []
+    for delay in delays:
+        backtester = LatencyBacktester(trader_class(), make_delay(delay))
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            pnl = backtester.run(ticks, market_trades)
+        run_seconds = float(np.mean(backtester.run_seconds)) if backtester.run_seconds else 0.0
+        rows.append((delay, pnl, backtester.n_fills, run_seconds))
+    return rows
+
+
+def decay_slope(rows):
+    # Least-squares change in total PnL per timestamp unit of delay.
+    delays = np.array([row[0] for row in rows], dtype=float)
+    totals = np.array([sum(row[1].values()) for row in rows])
+    if len(rows) < 2 or np.ptp(delays) == 0:
+        return 0.0
+    return float(np.polyfit(delays, totals, 1)[0])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trader')
+    parser.add_argument('prices')
+    parser.add_argument('trades', nargs='?')
+    parser.add_argument('--delays', type=float, nargs='+', default=[0, 100, 200, 300, 500, 1000],
+                        help='fixed (or mean, with --jitter) delays in timestamp units')
+    parser.add_argument('--jitter', type=float, default=None,
+                        help='add an exponential delay with this mean, sampled per tick')
+    parser.add_argument('--units-per-second', type=float, default=None,
+                        help='timestamp units per real second, to price run() latency')
+    parser.add_argument('--run-time', action='store_true',
+                        help="add each tick's measured run() time to its (fixed or jittered) delay; needs --units-per-second")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.run_time and not args.units_per_second:
+        parser.error('--run-time needs --units-per-second')
+
+    trader_class = load_trader(args.trader)
+    ticks = read_prices(args.prices)
+    market_trades = read_trades(args.trades) if args.trades else {}
+    make_delay = fixed_delay
+    if args.jitter is not None:
+        make_delay = lambda delay: exponential_delay(args.jitter, delay, args.seed)
+    if args.run_time:
+        # Measured run() time on top of the fixed or jittered delay.
+        network = make_delay
+        make_delay = lambda delay: combined_delay(network(delay), run_time_delay(args.units_per_second))
+    rows = latency_decay(trader_class, ticks, args.delays, market_trades, make_delay)
+
+    baseline = sum(rows[0][1].values())
+    for delay, pnl, fills, run_seconds in rows:
+        total = sum(pnl.values())
+        products = '  '.join(f"{product}={value:.0f}" for product, value in pnl.items())
+        print(f"delay {delay:>7g}: pnl={total:>10.1f} ({total - baseline:>+9.1f})  fills={fills:>6}  {products}")
+    slope = decay_slope(rows)
+    print(f"pnl per timestamp unit of delay: {slope:.3f}")
+    if args.units_per_second:
+        per_us = slope * args.units_per_second * 1e-6
+        run_us = np.mean([row[3] for row in rows]) * 1e6
+        print(f"pnl per microsecond of latency: {per_us:.4f}; run() takes {run_us:.1f}us per tick, "
+              f"worth {per_us * run_us:.2f} pnl")
@@ -0,0 +1,130 @@
+import argparse
+import contextlib
+import csv
+import glob
+import os
+import time
+
+import numpy as np
+
+from backtester import arrays_to_ticks, load_trader
+from datamodel import Observation, TradingState
+from synthetic_market import MarketGenerator, default_products
+
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+except ImportError:
+    plt = None
+
+# Accelerated replay load test for the Trader variants. Synthetic books are
+# fed straight into Trader.run as fast as it returns while the number of
+# products and book levels grows, recording throughput and p99 latency so
+# it's clear where each implementation stops scaling.
+#
+#   python loadgen.py                        # every variant, default sweep
+#   python loadgen.py harshcheepak2.py 7-5-2025.py --products 3,30,300 --levels 3,50,200
+
+
+def default_variants():
+    return sorted(glob.glob('*-*-2025*.py')) + sorted(glob.glob('harshcheepak*.py'))
+
+
+class SyntheticMarket:
+    # Per-tick TradingStates drawn from synthetic_market.MarketGenerator; the
+    # real symbols come first so the variants with hard-coded products still trade.
+    def __init__(self, n_products, n_levels, trades_per_tick=15, seed=0):
+        products = {name: {'regime': regime, 'trade_rate': trades_per_tick}
+                    for name, regime in default_products(n_products).items()}
+        self.generator = MarketGenerator(products, n_levels, seed)
+        self.products = self.generator.products
+        self.pending = iter(())
+
+    def next_state(self, position):
+        tick = next(self.pending, None)
+        if tick is None:
+            timestamps, book, trades = self.generator.chunk(256)
+            market_trades = self.generator.market_trades(trades)
+            self.pending = ((timestamp, depths, market_trades.get(timestamp, {}))
+                            for timestamp, depths in arrays_to_ticks(timestamps, self.products, book))
+            tick = next(self.pending)
+        timestamp, order_depths, market_trades = tick
+        return TradingState('', timestamp, {}, order_depths, {}, market_trades, position, Observation({}, {}))
+
+
+def measure(trader_class, n_products, n_levels, ticks=100, warmup=10):
+    market = SyntheticMarket(n_products, n_levels)
+    trader = trader_class()
+    latencies = np.zeros(ticks)
+    position = {}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(warmup + ticks):
+            state = market.next_state(position)
+            start = time.perf_counter()
+            trader.run(state)
+            if i >= warmup:
+                latencies[i - warmup] = time.perf_counter() - start
+    return {
+        'ticks_per_s': ticks / latencies.sum(),
+        'p99_us': float(np.percentile(latencies, 99) * 1e6),
+    }
+
+
+def sweep(variants, products, levels, ticks):
+    # Products grow at the shallowest depth and depth grows at the smallest
+    # universe; a full grid is rarely needed to see where scaling breaks.
+    points = [(n, levels[0]) for n in products] + [(products[0], n) for n in levels[1:]]
+    rows = []
+    for path in variants:
+        trader_class = load_trader(path)
+        for n_products, n_levels in points:
+            try:
+                result = measure(trader_class, n_products, n_levels, ticks)
+            except Exception as e:
+                print(f"{path}: failed at products={n_products} levels={n_levels}: {e!r}")
+                break
+            rows.append({'variant': path, 'products': n_products, 'levels': n_levels, **result})
+            print(f"{path:<22} products={n_products:<4} levels={n_levels:<4} "
+                  f"{result['ticks_per_s']:>10.0f} ticks/s  p99={result['p99_us']:>10.0f}us")
+    return rows
+
+
+def plot(rows, products, levels, path):
+    if plt is None:
+        print("matplotlib not installed, skipping plot")
+        return
+    fig, axes = plt.subplots(2, 2, figsize=(12, 9))
+    for variant in dict.fromkeys(row['variant'] for row in rows):
+        by_products = [r for r in rows if r['variant'] == variant and r['levels'] == levels[0]]
+        by_levels = [r for r in rows if r['variant'] == variant and r['products'] == products[0]]
+        for column, points, key in ((0, by_products, 'products'), (1, by_levels, 'levels')):
+            x = [r[key] for r in points]
+            axes[0][column].plot(x, [r['ticks_per_s'] for r in points], marker='o', label=variant)
+            axes[1][column].plot(x, [r['p99_us'] for r in points], marker='o', label=variant)
+    for column, key in ((0, 'products'), (1, 'book levels')):
+        axes[0][column].set(xlabel=key, ylabel='ticks/s', xscale='log', yscale='log')
+        axes[1][column].set(xlabel=key, ylabel='p99 latency (us)', xscale='log', yscale='log')
+    axes[0][0].legend(fontsize='small')
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"wrote {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('variants', nargs='*')
+    parser.add_argument('--products', default='3,10,30,100,300,500')
+    parser.add_argument('--levels', default='3,10,30,100,200')
+    parser.add_argument('--ticks', type=int, default=100)
+    parser.add_argument('--out', default='loadgen')
+    args = parser.parse_args()
+
+    products = [int(n) for n in args.products.split(',')]
+    levels = [int(n) for n in args.levels.split(',')]
+    rows = sweep(args.variants or default_variants(), products, levels, args.ticks)
+    with open(args.out + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['variant', 'products', 'levels', 'ticks_per_s', 'p99_us'])
+        writer.writeheader()
+        writer.writerows(rows)
+    plot(rows, products, levels, args.out + '.png')
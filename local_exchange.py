@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import struct
+import time
+
+import numpy as np
+
+from backtester import Backtester, load_trader, orders_to_array, read_prices, read_trades
+from datamodel import Observation, Order, OrderDepth, Trade, TradingState
+
+# Local stand-in for the exchange. The server streams each recorded tick as
+# a TradingState message to a Trader client in another process over a local
+# TCP socket, matches the orders it sends back with the backtester's
+# matcher, and measures round-trip latency per tick.
+#
+#   python local_exchange.py harshcheepak2.py prices_round_1_day_0.csv --rate 1000
+#
+# With no --rate the ticks go out as fast as the client answers, which gives
+# the maximum sustainable tick rate.
+
+HEADER = struct.Struct('>I')
+
+
+async def send_message(writer, payload):
+    data = json.dumps(payload, separators=(',', ':')).encode()
+    writer.write(HEADER.pack(len(data)) + data)
+    await writer.drain()
+
+
+async def read_message(reader):
+    header = await reader.readexactly(HEADER.size)
+    return json.loads(await reader.readexactly(HEADER.unpack(header)[0]))
+
+
+def encode_trades(trades):
+    return {symbol: [[t.price, t.quantity, t.buyer, t.seller, t.timestamp] for t in symbol_trades]
+            for symbol, symbol_trades in trades.items()}
+
+
+def decode_trades(trades):
+    return {symbol: [Trade(symbol, price, quantity, buyer, seller, timestamp)
+                     for price, quantity, buyer, seller, timestamp in symbol_trades]
+            for symbol, symbol_trades in trades.items()}
+
+
+def encode_state(state):
+    # JSON object keys are strings, so book levels go over as [price, volume] pairs.
+    return {
+        'traderData': state.traderData,
+        'timestamp': state.timestamp,
+        'order_depths': {product: [list(depth.buy_orders.items()), list(depth.sell_orders.items())]
+                         for product, depth in state.order_depths.items()},
+        'own_trades': encode_trades(state.own_trades),
+        'market_trades': encode_trades(state.market_trades),
+        'position': state.position,
+    }
+
+
+def decode_state(message):
+    order_depths = {}
+    for product, (buy_orders, sell_orders) in message['order_depths'].items():
+        depth = OrderDepth()
+        depth.buy_orders = {price: volume for price, volume in buy_orders}
+        depth.sell_orders = {price: volume for price, volume in sell_orders}
+        order_depths[product] = depth
+    return TradingState(message['traderData'], message['timestamp'], {}, order_depths,
+                        decode_trades(message['own_trades']), decode_trades(message['market_trades']),
+                        message['position'], Observation({}, {}))
+
+
+class LocalExchange:
+    def __init__(self, ticks, market_trades=None, rate=None, position_limits=None):
+        self.ticks = ticks
+        self.market_trades = market_trades or {}
+        self.rate = rate
+        self.book = Backtester(None, position_limits)
+        self.latencies = np.zeros(len(ticks))
+        self.late_ticks = 0
+        self.elapsed = 0.0
+        self.done = asyncio.Event()
+
+    async def handle(self, reader, writer):
+        book = self.book
+        start = time.perf_counter()
+        for i, (timestamp, order_depths) in enumerate(self.ticks):
+            if self.rate:
+                due = start + i / self.rate
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                elif wait < -1 / self.rate:
+                    self.late_ticks += 1
+            for product in order_depths:
+                book.product_id(product)
+            state = book.make_state(timestamp, order_depths, self.market_trades.get(timestamp))
+
+            sent = time.perf_counter()
+            await send_message(writer, encode_state(state))
+            reply = await read_message(reader)
+            self.latencies[i] = time.perf_counter() - sent
+
+            result = {product: [Order(product, price, quantity) for price, quantity in orders]
+                      for product, orders in reply['orders'].items()}
+            book.settle(timestamp, order_depths, orders_to_array(result, book.product_ids), book.products,
+                        reply['traderData'])
+        self.elapsed = time.perf_counter() - start
+        await send_message(writer, None)
+        writer.close()
+        self.done.set()
+
+    async def serve(self, host='127.0.0.1', port=0, client=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        port = server.sockets[0].getsockname()[1]
+        process = None
+        if client is not None:
+            process = multiprocessing.Process(target=run_client, args=(client, host, port))
+            process.start()
+        async with server:
+            await self.done.wait()
+        if process is not None:
+            process.join()
+        return self.report()
+
+    def report(self):
+        latencies = self.latencies * 1e6
+        return {
+            'ticks': len(self.ticks),
+            'rate': len(self.ticks) / self.elapsed if self.elapsed else 0.0,
+            'late_ticks': self.late_ticks,
+            'mean_us': float(latencies.mean()) if len(latencies) else 0.0,
+            'p50_us': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'p99_us': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            'max_us': float(latencies.max()) if len(latencies) else 0.0,
+            'pnl': self.book.pnl(),
+        }
+
+
+async def client_loop(trader, host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    while True:
+        message = await read_message(reader)
+        if message is None:
+            break
+        result, conversions, trader_data = trader.run(decode_state(message))
+        await send_message(writer, {
+            'orders': {product: [[int(o.price), int(o.quantity)] for o in orders] for product, orders in result.items()},
+            'conversions': conversions,
+            'traderData': trader_data if isinstance(trader_data, str) else '',
+        })
+    writer.close()
+
+
+def run_client(trader_path, host, port):
+    asyncio.run(client_loop(load_trader(trader_path)(), host, port))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trader')
+    parser.add_argument('prices')
+    parser.add_argument('trades', nargs='?')
+    parser.add_argument('--rate', type=float, default=None, help='ticks per second (default: as fast as possible)')
+    args = parser.parse_args()
+
+    exchange = LocalExchange(read_prices(args.prices), read_trades(args.trades) if args.trades else {}, args.rate)
+    report = asyncio.run(exchange.serve(client=args.trader))
+    print(f"{report['ticks']} ticks at {report['rate']:.0f}/s ({report['late_ticks']} late), "
+          f"round trip mean={report['mean_us']:.0f}us p50={report['p50_us']:.0f}us "
+          f"p99={report['p99_us']:.0f}us max={report['max_us']:.0f}us")
+    print(f"TOTAL pnl: {sum(report['pnl'].values()):.1f}")
@@ -0,0 +1,173 @@
+import sys
+import tracemalloc
+from collections import defaultdict
+
+from backtester import Backtester, load_trader, read_prices, read_trades
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Opt-in allocation accounting for a backtest. Every method of the Trader
+# (strategies and helpers like get_position_size / get_mid_price) is wrapped
+# on the instance so each call records the bytes and blocks it left behind
+# and the transient peak it reached. Short-lived garbage nets to zero by the
+# end of a tick, so per-tick churn is read from tracemalloc's peak instead:
+# each tick's peak over its starting size, and, with trace_lines, each line
+# of the Trader's file's peak while it runs, which ranks the lines that
+# allocate temporaries.
+#
+#   python memprofile.py harshcheepak2.py prices_round_1_day_0.csv [trades_round_1_day_0.csv]
+
+
+class MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.net_bytes = 0
+        self.net_blocks = 0
+        self.transient_bytes = 0
+        self.peak_bytes = 0
+
+
+class MemoryProfiler:
+    def __init__(self, trader, methods=None, trace_lines=True, nframes=1):
+        self.trader = trader
+        self.trace_lines = trace_lines
+        self.trader_file = type(trader).__init__.__code__.co_filename
+        self.nframes = nframes
+        self.stats = defaultdict(MethodStats)
+        self.tick_bytes = []
+        self.tick_transient = []
+        self.tick_peak = 0
+        self.line_bytes = defaultdict(int)
+        self.line_count = defaultdict(int)
+        self.line = None
+        self.line_start = 0
+        self.peak_traced = 0
+        self.stack = []
+        if methods is None:
+            methods = [name for name, value in vars(type(trader)).items()
+                       if callable(value) and not name.startswith('__') and name not in ('run', 'run_columnar')]
+        for name in methods:
+            setattr(trader, name, self.wrap(name, getattr(trader, name)))
+
+    def wrap(self, name, method):
+        stats = self.stats[name]
+        stack = self.stack
+
+        def profiled(*args, **kwargs):
+            self.note_peak()
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            blocks = sys.getallocatedblocks()
+            frame = [start, start]
+            stack.append(frame)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stack.pop()
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame[1])
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+                self.tick_peak = max(self.tick_peak, peak)
+                stats.calls += 1
+                stats.net_bytes += current - start
+                stats.net_blocks += sys.getallocatedblocks() - blocks
+                stats.transient_bytes += peak - start
+                stats.peak_bytes = max(stats.peak_bytes, peak - start)
+
+        return profiled
+
+    def note_peak(self):
+        # reset_peak() is global, so whoever resets it first hands the peak
+        # seen so far to the enclosing method call and to the tick.
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1][1] = max(self.stack[-1][1], peak)
+        self.tick_peak = max(self.tick_peak, peak)
+        return current, peak
+
+    def trace(self, frame, event, arg):
+        return self.trace_line if frame.f_code.co_filename == self.trader_file else None
+
+    def trace_line(self, frame, event, arg):
+        # Charges the peak reached since the previous line event to the line
+        # that was running, then starts the next line from the current size.
+        if event not in ('line', 'return'):
+            return self.trace_line
+        _, peak = self.note_peak()
+        if self.line is not None:
+            self.line_bytes[self.line] += peak - self.line_start
+            self.line_count[self.line] += 1
+        caller = frame.f_back
+        if event == 'line':
+            self.line = (frame.f_code.co_filename, frame.f_lineno)
+        elif caller is not None and caller.f_code.co_filename == self.trader_file:
+            self.line = (caller.f_code.co_filename, caller.f_lineno)  # the rest of the calling line
+        else:
+            self.line = None
+        # Read after the bookkeeping above, so it isn't charged to the next line.
+        self.line_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        return self.trace_line
+
+    def run(self, ticks, market_trades=None):
+        market_trades = market_trades or {}
+        backtester = Backtester(self.trader)
+        tracemalloc.start(self.nframes)
+        if self.trace_lines:
+            sys.settrace(self.trace)
+        try:
+            for timestamp, order_depths in ticks:
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                self.tick_peak = before
+                self.line = None
+                backtester.step(timestamp, order_depths, market_trades.get(timestamp))
+                current, _ = self.note_peak()
+                self.tick_bytes.append(current - before)
+                self.tick_transient.append(self.tick_peak - before)
+                self.peak_traced = max(self.peak_traced, self.tick_peak)
+        finally:
+            sys.settrace(None)
+            tracemalloc.stop()
+        return backtester
+
+    def top_allocators(self, limit=10):
+        # Lines by the temporary bytes they allocated, summed over executions.
+        lines = sorted(self.line_bytes.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(filename, lineno, size, self.line_count[(filename, lineno)]) for (filename, lineno), size in lines]
+
+    def peak_rss(self):
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        if resource is None:
+            return None
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+    def report(self):
+        ticks = max(len(self.tick_bytes), 1)
+        lines = [f"{'method':<32}{'calls':>8}{'net B/tick':>12}{'net blk/tick':>14}{'transient B/call':>18}{'peak B':>10}"]
+        for name, s in sorted(self.stats.items(), key=lambda item: item[1].transient_bytes, reverse=True):
+            if s.calls:
+                lines.append(f"{name:<32}{s.calls:>8}{s.net_bytes / ticks:>12.1f}{s.net_blocks / ticks:>14.2f}"
+                             f"{s.transient_bytes / s.calls:>18.1f}{s.peak_bytes:>10}")
+        lines.append('')
+        if self.line_bytes:
+            lines.append('top allocating lines (transient bytes per run of the line):')
+            for filename, lineno, size, count in self.top_allocators():
+                lines.append(f"  {filename}:{lineno}  {size / count:.1f} B x {count} runs = {size} B")
+            lines.append('')
+        transient = sum(self.tick_transient) / ticks
+        lines.append(f"ticks: {len(self.tick_bytes)}, transient: {transient:.1f} B/tick "
+                     f"(max {max(self.tick_transient, default=0)} B), net growth: {sum(self.tick_bytes)} B, "
+                     f"peak traced: {self.peak_traced} B, peak RSS: {self.peak_rss()} B")
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    profiler = MemoryProfiler(load_trader(sys.argv[1])())
+    profiler.run(read_prices(sys.argv[2]), read_trades(sys.argv[3]) if len(sys.argv) > 3 else {})
+    print(profiler.report())
@@ -0,0 +1,223 @@
+import argparse
+import marshal
+import struct
+import time
+
+from backtester import Backtester, load_trader, read_prices, read_trades
+from datamodel import ConversionObservation, Listing, Observation, OrderDepth, Trade, TradingState
+
+# Opt-in session recorder. RecordingTrader wraps any Trader and, on every
+# run call, appends the TradingState it was given (books, own and market
+# trades, positions, observations, traderData) and what it returned (orders,
+# conversions, traderData) to a binary log. Records are plain tuples and
+# dicts serialised with marshal format 2 (the cheapest encoder in the
+# standard library; later formats spend time tracking shared references),
+# and collect in a buffer that is written out in large blocks. Replayer
+# feeds a log back through any Trader and compares its orders with the
+# recorded ones.
+#
+#   trader = RecordingTrader(Trader(), 'session.trlog')   # ... trader.close()
+#   python recorder.py record harshcheepak2.py prices.csv [trades.csv] -o session.trlog
+#   python recorder.py replay session.trlog harshcheepak2.py
+#
+# Layout: MAGIC, then per tick two FRAME-length-prefixed marshal blobs, the
+# state and the output.
+
+MAGIC = b'TRLOG\x01'
+FRAME = struct.Struct('<I')
+MARSHAL_VERSION = 2
+
+
+def encode_trades(trades):
+    return {symbol: [(t.price, t.quantity, t.buyer, t.seller, t.timestamp) for t in symbol_trades]
+            for symbol, symbol_trades in trades.items()}
+
+
+def decode_trades(trades):
+    return {symbol: [Trade(symbol, price, quantity, buyer, seller, timestamp)
+                     for price, quantity, buyer, seller, timestamp in symbol_trades]
+            for symbol, symbol_trades in trades.items()}
+
+
+def encode_state(state):
+    # No copies: the result is marshalled before the trader sees the state.
+    observations = state.observations
+    if observations is not None:
+        observations = (observations.plainValueObservations,
+                        {product: (o.bidPrice, o.askPrice, o.transportFees, o.exportTariff, o.importTariff,
+                                   o.sugarPrice, o.sunlightIndex)
+                         for product, o in observations.conversionObservations.items()})
+    return (
+        state.traderData,
+        state.timestamp,
+        {symbol: (listing.symbol, listing.product, listing.denomination) for symbol, listing in state.listings.items()},
+        {product: (depth.buy_orders, depth.sell_orders) for product, depth in state.order_depths.items()},
+        encode_trades(state.own_trades),
+        encode_trades(state.market_trades),
+        state.position,
+        observations,
+    )
+
+
+def decode_state(record):
+    trader_data, timestamp, listings, order_depths, own_trades, market_trades, position, observations = record
+    depths = {}
+    for product, (buy_orders, sell_orders) in order_depths.items():
+        depth = OrderDepth()
+        depth.buy_orders = buy_orders
+        depth.sell_orders = sell_orders
+        depths[product] = depth
+    if observations is not None:
+        plain, conversions = observations
+        observations = Observation(plain, {product: ConversionObservation(*values)
+                                           for product, values in conversions.items()})
+    return TradingState(trader_data, timestamp, {symbol: Listing(*listing) for symbol, listing in listings.items()},
+                        depths, decode_trades(own_trades), decode_trades(market_trades), position, observations)
+
+
+def plain(value):
+    # marshal only takes built-in types; some variants hand back NumPy scalars.
+    if isinstance(value, (list, tuple)):
+        return type(value)(plain(v) for v in value)
+    if isinstance(value, dict):
+        return {plain(k): plain(v) for k, v in value.items()}
+    return value.item() if hasattr(value, 'item') else value
+
+
+def dumps(record):
+    try:
+        return marshal.dumps(record, MARSHAL_VERSION)
+    except ValueError:
+        return marshal.dumps(plain(record), MARSHAL_VERSION)
+
+
+def encode_output(result, conversions, trader_data):
+    return dumps(({product: [(order.price, order.quantity) for order in orders] for product, orders in result.items()},
+                  conversions, trader_data))
+
+
+class RecordingTrader:
+    def __init__(self, trader, path, buffer_size=1 << 20):
+        self.trader = trader
+        self.f = open(path, 'wb')
+        self.f.write(MAGIC)
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.ticks = 0
+        self.seconds = 0.0
+
+    def __getattr__(self, name):
+        # Everything but run (reports, products, ...) goes to the wrapped trader.
+        # run_columnar is hidden so the backtester calls run and it gets recorded.
+        if name == 'run_columnar':
+            raise AttributeError(name)
+        return getattr(self.trader, name)
+
+    def run(self, state):
+        # The state is encoded before run so anything the trader mutates is
+        # recorded as it arrived.
+        began = time.perf_counter()
+        state_blob = dumps(encode_state(state))
+        self.seconds += time.perf_counter() - began
+
+        result, conversions, trader_data = self.trader.run(state)
+
+        began = time.perf_counter()
+        output_blob = encode_output(result, conversions, trader_data)
+        buffer = self.buffer
+        buffer += FRAME.pack(len(state_blob))
+        buffer += state_blob
+        buffer += FRAME.pack(len(output_blob))
+        buffer += output_blob
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+        self.ticks += 1
+        self.seconds += time.perf_counter() - began
+        return result, conversions, trader_data
+
+    def flush(self):
+        self.f.write(self.buffer)
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+    def overhead_us(self):
+        return self.seconds / self.ticks * 1e6 if self.ticks else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Replayer:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        if not self.data.startswith(MAGIC):
+            raise ValueError(f'{path} is not a recorder log')
+
+    def records(self):
+        # (state record, output record) per tick, still as tuples.
+        data = memoryview(self.data)
+        offset = len(MAGIC)
+        while offset < len(data):
+            blobs = []
+            for _ in range(2):
+                length = FRAME.unpack_from(data, offset)[0]
+                offset += FRAME.size
+                blobs.append(marshal.loads(data[offset:offset + length]))
+                offset += length
+            yield blobs[0], blobs[1]
+
+    def states(self):
+        for state, _ in self.records():
+            yield decode_state(state)
+
+    def replay(self, trader):
+        # Per tick: (timestamp, recorded orders, replayed orders), orders as
+        # {product: [(price, quantity)]}.
+        for state, (recorded, _, _) in self.records():
+            result, conversions, trader_data = trader.run(decode_state(state))
+            replayed = marshal.loads(encode_output(result, conversions, trader_data))[0]
+            yield state[1], recorded, replayed
+
+    def verify(self, trader):
+        # The first tick whose orders differ, as (tick, timestamp, recorded,
+        # replayed), or None if the whole log reproduces.
+        for tick, (timestamp, recorded, replayed) in enumerate(self.replay(trader)):
+            if recorded != replayed:
+                return tick, timestamp, recorded, replayed
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help='backtest a trader and record what it saw and sent')
+    record.add_argument('trader')
+    record.add_argument('prices')
+    record.add_argument('trades', nargs='?')
+    record.add_argument('-o', '--out', required=True)
+    replay = commands.add_parser('replay', help='check a trader reproduces a recorded order stream')
+    replay.add_argument('log')
+    replay.add_argument('trader')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        ticks = read_prices(args.prices)
+        with RecordingTrader(load_trader(args.trader)(), args.out) as trader:
+            Backtester(trader).run(ticks, read_trades(args.trades) if args.trades else {})
+        print(f"recorded {trader.ticks} ticks to {args.out}, {trader.overhead_us():.1f}us per tick")
+    else:
+        mismatch = Replayer(args.log).verify(load_trader(args.trader)())
+        if mismatch is None:
+            print("identical order stream")
+        else:
+            tick, timestamp, recorded, replayed = mismatch
+            print(f"orders differ from tick {tick} (timestamp {timestamp})")
+            print(f"  recorded: {recorded}")
+            print(f"  replayed: {replayed}")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from backtester import Backtester, load_trader
+
+# Content-addressed cache of per-product backtest results. A result is keyed
+# by the hash of the Trader file and of the backtest engine (matching, limits,
+# the data model), the product's effective parameters and the product's slice
+# of market data, so re-running a sweep after changing one product_params
+# entry only recomputes the products whose inputs changed. Least recently
+# used entries are evicted once the cache outgrows max_bytes.
+
+# Bump when the stored result format changes.
+CACHE_VERSION = 1
+ENGINE_FILES = ('backtester.py', 'datamodel.py')
+# Sizing modes that read the cross-product covariance: a product's result
+# depends on every other product, so it can't be run or cached on its own.
+CROSS_PRODUCT_SIZING = ('risk_parity',)
+
+
+class ResultCache:
+    def __init__(self, path='backtest_cache.sqlite', max_bytes=256 * 1024 * 1024):
+        self.db = sqlite3.connect(path)
+        self.max_bytes = max_bytes
+        self.db.execute('CREATE TABLE IF NOT EXISTS results '
+                        '(key TEXT PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        self.db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        row = self.db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value)
+        self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (key, data, len(data), time.time()))
+        self.evict()
+        self.db.commit()
+
+    def size(self):
+        return self.db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def evict(self):
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        for key, size in self.db.execute('SELECT key, size FROM results ORDER BY last_used').fetchall():
+            if freed >= excess:
+                break
+            self.db.execute('DELETE FROM results WHERE key = ?', (key,))
+            freed += size
+
+    def close(self):
+        self.db.close()
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def product_ticks(ticks, product):
+    return [(timestamp, {product: depths[product]}) for timestamp, depths in ticks if product in depths]
+
+
+def data_fingerprint(ticks, product, market_trades=None):
+    digest = hashlib.sha256(product.encode())
+    for timestamp, depths in ticks:
+        depth = depths.get(product)
+        if depth is None:
+            continue
+        digest.update(repr((timestamp, sorted(depth.buy_orders.items()), sorted(depth.sell_orders.items()))).encode())
+        for trade in (market_trades or {}).get(timestamp, {}).get(product, []):
+            digest.update(repr((timestamp, trade.price, trade.quantity)).encode())
+    return digest.hexdigest()
+
+
+def make_trader(trader_class, params=None, warm_start=None):
+    # Only Traders that take a params= override (harshcheepak2.py) can be
+    # swept, and only those that take warm_start= can be warm-started.
+    kwargs = {}
+    if params:
+        kwargs['params'] = params
+    if warm_start:
+        kwargs['warm_start'] = warm_start
+    return trader_class(**kwargs)
+
+
+def effective_params(trader_class, product, overrides=None):
+    # The product's configuration after overrides, minus runtime state such
+    # as ring buffers, which is the same for every run.
+    trader = make_trader(trader_class, {product: overrides} if overrides else None)
+    params = getattr(trader, 'product_params', {}).get(product, {})
+    return {key: value for key, value in params.items()
+            if isinstance(value, (int, float, str, bool, tuple, list, type(None)))}
+
+
+def engine_hash():
+    here = os.path.dirname(os.path.abspath(__file__))
+    return [CACHE_VERSION] + [file_hash(os.path.join(here, name)) for name in ENGINE_FILES]
+
+
+def product_result(backtester, product):
+    fills = backtester.fills[:backtester.n_fills]
+    product_id = backtester.product_ids.get(product, -1)
+    return {
+        'pnl': backtester.pnl().get(product, 0.0),
+        'position': backtester.position.get(product, 0),
+        'fills': int((fills['product'] == product_id).sum()),
+    }
+
+
+def cached_backtest(cache, trader_path, ticks, params=None, market_trades=None, products=None):
+    # Runs each product on its own slice of the data, reusing any product
+    # whose code, parameters and data are already in the cache. Products
+    # sized from the cross-product covariance ('risk_parity') are never
+    # cached: they come from one uncached backtest over all products.
+    params = params or {}
+    trader_class = load_trader(trader_path)
+    code = [file_hash(trader_path)] + engine_hash()
+    if products is None:
+        products = sorted({product for _, depths in ticks for product in depths})
+
+    results = {}
+    shared = None
+    for product in products:
+        effective = effective_params(trader_class, product, params.get(product))
+        if effective.get('position_sizing') in CROSS_PRODUCT_SIZING:
+            if shared is None:
+                shared = Backtester(make_trader(trader_class, params))
+                shared.run(ticks, market_trades)
+            results[product] = product_result(shared, product)
+            continue
+        key_source = json.dumps([code, product, effective, data_fingerprint(ticks, product, market_trades)],
+                                sort_keys=True, default=str)
+        key = hashlib.sha256(key_source.encode()).hexdigest()
+        result = cache.get(key)
+        if result is None:
+            overrides = {product: params[product]} if product in params else None
+            backtester = Backtester(make_trader(trader_class, overrides))
+            backtester.run(product_ticks(ticks, product), market_trades)
+            result = product_result(backtester, product)
+            cache.put(key, result)
+        results[product] = result
+    return results
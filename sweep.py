@@ -0,0 +1,130 @@
+import argparse
+import ast
+import itertools
+import math
+import random
+
+from backtester import Backtester, load_trader, read_prices, read_trades
+from indicator_cache import IndicatorCache
+from result_cache import make_trader, product_ticks
+
+# Parameter sweeps with successive halving. Every candidate is backtested on
+# a short prefix of the data, the best 1/eta are kept, and the survivors'
+# backtests are resumed (not restarted) on a longer horizon, until the last
+# few run over the full data.
+#
+#   python sweep.py harshcheepak2.py prices.csv --product SQUID_INK \
+#       --grid window_size=3,5,10,20 base_qty=5,10,20 strategy="'zscore','bollinger'"
+
+
+def grid(**axes):
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+class SuccessiveHalving:
+    def __init__(self, trader_path, ticks, candidates, product=None, eta=3, min_fraction=1 / 27,
+                 market_trades=None, indicators=None):
+        # candidates are product_params overrides: {product: {...}} each, or
+        # plain {...} dicts when `product` is given.
+        self.trader_class = load_trader(trader_path)
+        self.product = product
+        self.ticks = product_ticks(ticks, product) if product else ticks
+        self.candidates = [{product: c} if product else c for c in candidates]
+        self.eta = eta
+        self.min_fraction = min_fraction
+        self.market_trades = market_trades or {}
+        self.indicators = indicators  # optional IndicatorCache shared by every candidate
+        self.ticks_run = 0
+
+    def make_trader(self, candidate):
+        trader = make_trader(self.trader_class, candidate)
+        if self.indicators is not None:
+            self.indicators.attach(trader, self.ticks, [self.product] if self.product else None)
+        return trader
+
+    def horizons(self):
+        n = len(self.ticks)
+        rungs = max(0, math.ceil(math.log(1 / self.min_fraction, self.eta) - 1e-9))
+        return [max(1, int(n * self.min_fraction * self.eta ** k)) for k in range(rungs)] + [n]
+
+    def score(self, backtester):
+        pnl = backtester.pnl()
+        return pnl.get(self.product, 0.0) if self.product else sum(pnl.values())
+
+    def run(self):
+        alive = [(i, Backtester(self.make_trader(c))) for i, c in enumerate(self.candidates)]
+        done = 0
+        scores = {}
+        for horizon in self.horizons():
+            segment = self.ticks[done:horizon]
+            for i, backtester in alive:
+                backtester.run(segment, self.market_trades)
+                scores[i] = self.score(backtester)
+            self.ticks_run += len(segment) * len(alive)
+            done = horizon
+            alive.sort(key=lambda item: scores[item[0]], reverse=True)
+            if horizon < len(self.ticks):
+                alive = alive[:max(1, len(alive) // self.eta)]
+        return [(self.candidates[i], scores[i]) for i, _ in alive]
+
+    def savings(self):
+        full = len(self.ticks) * len(self.candidates)
+        return full / self.ticks_run if self.ticks_run else 0.0
+
+
+def hyperband(trader_path, ticks, candidates, product=None, eta=3, max_rungs=4, market_trades=None,
+              indicators=None, seed=0):
+    # Brackets trade off how many candidates start against how short the
+    # first horizon is. Bracket s halves over s rungs starting from
+    # ceil((max_rungs + 1) / (s + 1) * eta**s) candidates drawn at random, so
+    # the most aggressive bracket screens the most candidates and the last
+    # runs a handful on the full data. Returns the survivors with their
+    # scores, the ticks simulated, and what a full-grid sweep would cost.
+    rng = random.Random(seed)
+    results = []
+    ticks_run = 0
+    for rungs in range(max_rungs, -1, -1):
+        n = math.ceil((max_rungs + 1) / (rungs + 1) * eta ** rungs)
+        drawn = rng.sample(candidates, min(n, len(candidates)))
+        halving = SuccessiveHalving(trader_path, ticks, drawn, product, eta, eta ** -rungs, market_trades,
+                                    indicators)
+        results.extend(halving.run())
+        ticks_run += halving.ticks_run
+    results.sort(key=lambda item: item[1], reverse=True)
+    return results, ticks_run, len(halving.ticks) * len(candidates)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trader')
+    parser.add_argument('prices')
+    parser.add_argument('trades', nargs='?')
+    parser.add_argument('--product', required=True)
+    parser.add_argument('--grid', nargs='+', required=True, help='name=v1,v2,... (Python literals)')
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--min-fraction', type=float, default=1 / 27)
+    parser.add_argument('--indicator-cache', default=None, help='directory for shared indicator series')
+    parser.add_argument('--hyperband', type=int, default=None, metavar='MAX_RUNGS',
+                        help='run Hyperband brackets over randomly drawn candidates instead of one halving')
+    args = parser.parse_args()
+
+    axes = {}
+    for axis in args.grid:
+        name, values = axis.split('=', 1)
+        axes[name] = list(ast.literal_eval(f'[{values}]'))
+    ticks = read_prices(args.prices)
+    market_trades = read_trades(args.trades) if args.trades else {}
+    indicators = IndicatorCache(args.indicator_cache) if args.indicator_cache else None
+    if args.hyperband is not None:
+        results, ticks_run, full = hyperband(args.trader, ticks, grid(**axes), args.product, args.eta, args.hyperband,
+                                             market_trades, indicators)
+        for candidate, score in results:
+            print(f"{score:>10.1f}  {candidate}")
+        print(f"simulated {ticks_run} ticks, {full / ticks_run:.1f}x less than a full sweep of {full}")
+    else:
+        halving = SuccessiveHalving(args.trader, ticks, grid(**axes), args.product, args.eta, args.min_fraction,
+                                    market_trades, indicators)
+        for candidate, score in halving.run():
+            print(f"{score:>10.1f}  {candidate}")
+        print(f"simulated {halving.ticks_run} ticks, {halving.savings():.1f}x less than a full sweep")
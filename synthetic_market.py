@@ -0,0 +1,205 @@
+import argparse
+import time
+
+import numpy as np
+
+from backtester import Backtester, arrays_to_ticks, load_trader
+from datamodel import Trade
+
+# Vectorised synthetic market. Each product's fair value follows
+#
+#   x[t] = x[t-1] + drift + reversion * (start - x[t-1]) + volatility * N(0, 1) + jumps
+#
+# which covers a mean-reverting product like RAINFOREST_RESIN (reversion > 0),
+# a trending one (drift) and a jumpy one like SQUID_INK (Poisson jumps). The
+# recursion is linear, so whole blocks of ticks are solved at once with a
+# matrix of powers of (1 - reversion), and only block ends are carried in a
+# loop. Books (any depth) and market trades are drawn around the fair value
+# in the same columnar layout as backtester.ticks_to_arrays, chunk by chunk,
+# so arbitrarily long runs stream into a Backtester without being held in
+# memory. Output is deterministic for a given seed and chunk size.
+#
+#   python synthetic_market.py --products 100 --levels 5 --ticks 1000000
+#   python synthetic_market.py --ticks 200000 --trader harshcheepak2.py
+#   python synthetic_market.py --ticks 1000000 --out synthetic.tka
+
+REGIMES = {
+    'mean_reverting': {'start': 10000.0, 'drift': 0.0, 'reversion': 0.1, 'volatility': 1.0,
+                       'jump_rate': 0.0, 'jump_size': 0.0, 'spread': (2, 8), 'trade_rate': 0.5},
+    'trending': {'start': 2000.0, 'drift': 0.02, 'reversion': 0.0, 'volatility': 0.7,
+                 'jump_rate': 0.0, 'jump_size': 0.0, 'spread': (1, 4), 'trade_rate': 0.5},
+    'jumpy': {'start': 2000.0, 'drift': 0.0, 'reversion': 0.002, 'volatility': 1.5,
+              'jump_rate': 0.005, 'jump_size': 30.0, 'spread': (1, 4), 'trade_rate': 0.8},
+}
+DEFAULT_REGIMES = {'RAINFOREST_RESIN': 'mean_reverting', 'KELP': 'trending', 'SQUID_INK': 'jumpy'}
+TRADE_DTYPE = np.dtype([('timestamp', np.int64), ('product', np.int32), ('price', np.int64), ('quantity', np.int32)])
+BLOCK = 64
+
+
+def default_products(n):
+    # The real symbols first, in their usual regimes, then SYNTH_i cycling through the regimes.
+    names = list(DEFAULT_REGIMES) + [f'SYNTH_{i}' for i in range(n)]
+    regimes = list(REGIMES)
+    return {name: DEFAULT_REGIMES.get(name, regimes[i % len(regimes)]) for i, name in enumerate(names[:n])}
+
+
+class MarketGenerator:
+    def __init__(self, products, levels=3, seed=0, timestep=100, empty_level=0.3, max_volume=30):
+        # products: {name: regime name or dict of overrides on a regime (with 'regime' key)}
+        self.rng = np.random.default_rng(seed)
+        self.products = list(products)
+        self.levels = levels
+        self.timestep = timestep
+        self.empty_level = empty_level
+        self.max_volume = max_volume
+        params = []
+        for spec in products.values():
+            if isinstance(spec, str):
+                spec = {'regime': spec}
+            params.append({**REGIMES[spec.get('regime', 'mean_reverting')], **spec})
+        self.params = params
+
+        def column(key):
+            return np.array([p[key] for p in params], dtype=float)
+
+        self.start = column('start')
+        self.drift = column('drift')
+        self.reversion = column('reversion')
+        self.volatility = column('volatility')
+        self.jump_rate = column('jump_rate')
+        self.jump_size = column('jump_size')
+        self.trade_rate = column('trade_rate')
+        self.spread_low = np.array([p['spread'][0] for p in params])
+        self.spread_high = np.array([p['spread'][1] for p in params])
+
+        # x[t] = phi * x[t-1] + u[t] with phi = 1 - reversion, solved a block
+        # at a time: powers[p, i, j] = phi_p ** (i - j) below the diagonal.
+        phi = 1 - self.reversion
+        steps = np.arange(BLOCK)
+        exponents = steps[:, None] - steps[None, :]
+        self.phi = phi
+        self.powers = np.where(exponents >= 0, phi[:, None, None] ** np.maximum(exponents, 0), 0.0)
+        self.carry = phi[None, :] ** (steps[:, None] + 1)  # carry[i, p] = phi_p ** (i + 1)
+        self.fair = self.start.copy()
+        self.tick = 0
+
+    def fair_values(self, n):
+        n_blocks = -(-n // BLOCK)
+        shocks = self.rng.standard_normal((n_blocks * BLOCK, len(self.products)))
+        jumps = self.rng.random((n_blocks * BLOCK, len(self.products))) < self.jump_rate
+        signs = self.rng.choice([-1.0, 1.0], size=jumps.shape)
+        increments = (self.drift + self.reversion * self.start) + self.volatility * shocks + jumps * signs * self.jump_size
+        blocks = increments.reshape(n_blocks, BLOCK, -1)
+        partial = np.matmul(self.powers, blocks.transpose(2, 1, 0)).transpose(2, 1, 0)
+        # Carry each block's end value into the next.
+        fair = np.empty_like(partial)
+        last = self.fair
+        for b in range(n_blocks):
+            fair[b] = partial[b] + self.carry * last
+            last = fair[b, -1]
+        fair = fair.reshape(-1, len(self.products))[:n]
+        self.fair = fair[-1].copy()
+        return fair
+
+    def chunk(self, n):
+        # n ticks as (timestamps, book[4, n, products, levels], trades).
+        rng = self.rng
+        n_products, levels = len(self.products), self.levels
+        timestamps = (self.tick + np.arange(n, dtype=np.int64)) * self.timestep
+        self.tick += n
+        fair = self.fair_values(n)
+
+        spread = rng.integers(self.spread_low, self.spread_high + 1, (n, n_products))
+        best_bid = np.floor(fair - spread / 2).astype(np.int64)
+        best_ask = best_bid + np.maximum(spread, 1)
+
+        # Generated level by level (levels is the short axis) in small dtypes,
+        # which is most of the cost at depth.
+        book = np.empty((4, n, n_products, levels), dtype=np.int64)
+        bid_price, ask_price = best_bid, best_ask
+        for level in range(levels):
+            volumes = rng.integers(1, self.max_volume + 1, (2, n, n_products), dtype=np.int16)
+            if level:
+                bid_price = bid_price - rng.integers(1, 3, (n, n_products), dtype=np.int8)
+                ask_price = ask_price + rng.integers(1, 3, (n, n_products), dtype=np.int8)
+                volumes *= rng.random((2, n, n_products), dtype=np.float32) >= self.empty_level
+            book[0, :, :, level] = bid_price * (volumes[0] > 0)
+            book[1, :, :, level] = volumes[0]
+            book[2, :, :, level] = ask_price * (volumes[1] > 0)
+            book[3, :, :, level] = volumes[1]
+
+        counts = rng.poisson(self.trade_rate, (n, n_products)).ravel()
+        cells = np.repeat(np.arange(n * n_products), counts)
+        buys = rng.random(len(cells)) < 0.5
+        trades = np.empty(len(cells), dtype=TRADE_DTYPE)
+        trades['timestamp'] = timestamps[cells // n_products]
+        trades['product'] = cells % n_products
+        trades['price'] = np.where(buys, best_ask.ravel()[cells], best_bid.ravel()[cells])
+        trades['quantity'] = rng.integers(1, 11, len(cells))
+        return timestamps, book, trades
+
+    def chunks(self, n_ticks, chunk_size=None):
+        # By default chunks hold about a million book cells.
+        chunk_size = chunk_size or max(1, 1_000_000 // (len(self.products) * self.levels))
+        while n_ticks > 0:
+            n = min(chunk_size, n_ticks)
+            n_ticks -= n
+            yield self.chunk(n)
+
+    def trade_objects(self, trades):
+        return [Trade(self.products[product], price, quantity, None, None, timestamp)
+                for timestamp, product, price, quantity in zip(*(trades[field].tolist() for field in TRADE_DTYPE.names))]
+
+    def market_trades(self, trades):
+        # TRADE_DTYPE rows -> {timestamp: {symbol: [Trade]}} like backtester.read_trades.
+        result = {}
+        for trade in self.trade_objects(trades):
+            result.setdefault(trade.timestamp, {}).setdefault(trade.symbol, []).append(trade)
+        return result
+
+    def stream(self, n_ticks, chunk_size=None):
+        # (ticks, market_trades) per chunk, ready for Backtester.run.
+        for timestamps, book, trades in self.chunks(n_ticks, chunk_size):
+            yield arrays_to_ticks(timestamps, self.products, book), self.market_trades(trades)
+
+
+def backtest(trader, generator, n_ticks, chunk_size=None):
+    backtester = Backtester(trader)
+    for ticks, market_trades in generator.stream(n_ticks, chunk_size):
+        backtester.run(ticks, market_trades)
+    return backtester
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=3)
+    parser.add_argument('--regime', choices=list(REGIMES), default=None, help='one regime for every product')
+    parser.add_argument('--levels', type=int, default=3)
+    parser.add_argument('--ticks', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trader', default=None, help='stream the market into a backtest of this trader')
+    parser.add_argument('--out', default=None, help='write a tick archive (see tick_archive.py)')
+    args = parser.parse_args()
+
+    products = default_products(args.products)
+    if args.regime:
+        products = {name: args.regime for name in products}
+    generator = MarketGenerator(products, args.levels, args.seed)
+    began = time.perf_counter()
+    if args.trader:
+        backtester = backtest(load_trader(args.trader)(), generator, args.ticks)
+        pnl = backtester.pnl()
+        for product in backtester.products:
+            print(f"{product}: position={backtester.position.get(product, 0)} pnl={pnl[product]:.1f}")
+        print(f"TOTAL: {sum(pnl.values()):.1f}, {backtester.n_fills} fills")
+    elif args.out:
+        from tick_archive import TickArchiveWriter
+        writer = TickArchiveWriter(args.out, generator.products, args.levels)
+        for timestamps, book, trades in generator.chunks(args.ticks, writer.chunk_size):
+            writer.write_chunk(timestamps, book, generator.trade_objects(trades))
+        writer.close()
+    else:
+        n_trades = sum(len(trades) for _, _, trades in generator.chunks(args.ticks))
+        print(f"{n_trades} trades")
+    seconds = time.perf_counter() - began
+    print(f"{args.ticks} ticks x {args.products} products in {seconds:.2f}s ({args.ticks / seconds:,.0f} ticks/s)")
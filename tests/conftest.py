@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat in the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def harshcheepak2_path():
+    return os.path.join(ROOT, 'harshcheepak2.py')
+
+
+@pytest.fixture
+def harshcheepak2(harshcheepak2_path):
+    from backtester import load_trader
+    return load_trader(harshcheepak2_path)
@@ -0,0 +1,44 @@
+import gc
+
+import pytest
+
+from backtester import allocation_profile
+from synthetic_market import MarketGenerator, default_products
+
+
+@pytest.fixture
+def gc_state():
+    # gc_between_ticks freezes and disables the collector process-wide.
+    enabled = gc.isenabled()
+    yield
+    gc.unfreeze()
+    if enabled:
+        gc.enable()
+    else:
+        gc.disable()
+
+
+@pytest.fixture(scope='module')
+def ticks():
+    return next(MarketGenerator(default_products(3)).stream(600))[0]
+
+
+def test_steady_state_ticks_allocate_nothing(harshcheepak2, gc_state, ticks):
+    deltas = allocation_profile(harshcheepak2(gc_between_ticks=True), ticks, warmup=100, window=50)
+    assert len(deltas) == 10
+    # A few one-off blocks at most; one retained block per tick would read 500.
+    assert abs(sum(deltas)) <= 20
+
+
+def test_a_per_tick_leak_is_caught(harshcheepak2, gc_state, ticks):
+    trader = harshcheepak2(gc_between_ticks=True)
+    leak = []
+    run_strategy = trader.run_strategy
+
+    def leaky(product, *args):
+        if product == 'KELP':
+            leak.append([])
+        return run_strategy(product, *args)
+
+    trader.run_strategy = leaky
+    assert sum(allocation_profile(trader, ticks, warmup=100, window=50)) >= 500
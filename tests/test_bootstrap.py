@@ -0,0 +1,11 @@
+import numpy as np
+
+from bootstrap import bootstrap
+
+
+def test_resamples_do_not_depend_on_the_worker_count():
+    curves = np.cumsum(np.random.default_rng(1).normal(size=(500, 3)), axis=0)
+    runs = [bootstrap(curves, n_resamples=600, workers=workers, seed=7) for workers in (1, 2)]
+    assert runs[0][0].shape == (600, 3)
+    np.testing.assert_array_equal(runs[0][0], runs[1][0])
+    np.testing.assert_array_equal(runs[0][1], runs[1][1])
@@ -0,0 +1,50 @@
+from backtester import Backtester
+from synthetic_market import MarketGenerator, default_products
+
+
+class Clock:
+    # Advances 1us per reading, plus whatever a test adds.
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1e-6
+        return self.now
+
+
+def slow_tick(trader, clock, product, tick, seconds):
+    run_strategy = trader.run_strategy
+
+    def run(name, *args):
+        if name == product and trader.ticks == tick:
+            clock.now += seconds
+        return run_strategy(name, *args)
+
+    trader.run_strategy = run
+
+
+def test_one_slow_tick_does_not_degrade_for_good(harshcheepak2):
+    trader = harshcheepak2(time_budget=0.001)
+    trader.clock = clock = Clock()
+    slow_tick(trader, clock, 'SQUID_INK', 100, 0.01)
+    ticks, _ = next(MarketGenerator(default_products(3)).stream(500))
+    Backtester(trader).run(ticks)
+    count, rate = trader.degradation_report()['SQUID_INK']
+    assert 0 < count < 20
+    assert rate == count / 500
+
+
+def test_degraded_products_keep_valuing(harshcheepak2):
+    # Never enough time for SQUID_INK's strategy: it is still valued and
+    # recorded every tick, and its fallback quote follows that value.
+    trader = harshcheepak2(time_budget=0.001)
+    trader.clock = Clock()
+    trader.product_params['SQUID_INK']['cost'] = float('inf')
+    ticks, _ = next(MarketGenerator(default_products(3)).stream(200))
+    Backtester(trader).run(ticks)
+    p = trader.product_params['SQUID_INK']
+    assert trader.degradation_report()['SQUID_INK'] == (200, 1.0)
+    assert p['history_count'] == 200
+    value = int(trader.price_history('SQUID_INK')[-1])
+    assert p['fallback_ask'] == value // 512 + p['fallback_spread']  # value in 1/512 ticks
+    assert len(set(trader.price_history('SQUID_INK').tolist())) > 1
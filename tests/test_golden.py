@@ -0,0 +1,15 @@
+import glob
+import os
+
+import pytest
+
+from golden import GOLDEN_DIR, check_golden, golden_path
+
+SESSIONS = sorted(glob.glob(os.path.join(os.path.dirname(GOLDEN_DIR), 'sessions', '*.trlog')))
+
+
+@pytest.mark.parametrize('log', SESSIONS, ids=os.path.basename)
+def test_orders_match_golden(harshcheepak2, log):
+    # {product: (tick, timestamp)} for every product whose orders changed.
+    divergences = check_golden(harshcheepak2, log, golden_path(GOLDEN_DIR, log))
+    assert {product: first for product, first in divergences.items() if first is not None} == {}
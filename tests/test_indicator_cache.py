@@ -0,0 +1,22 @@
+from backtester import Backtester
+from indicator_cache import IndicatorCache
+from synthetic_market import MarketGenerator, default_products
+
+
+def test_cached_rows_give_the_same_pnl(harshcheepak2, tmp_path):
+    ticks, _ = next(MarketGenerator(default_products(3)).stream(300))
+    plain = Backtester(harshcheepak2()).run(ticks)
+    trader = IndicatorCache(str(tmp_path)).attach(harshcheepak2(), ticks)
+    assert trader.indicator_cache
+    assert Backtester(trader).run(ticks) == plain
+    assert set(trader.indicator_cache) == {'KELP', 'RAINFOREST_RESIN', 'SQUID_INK'}
+
+
+def test_a_gap_drops_the_cache(harshcheepak2, tmp_path):
+    ticks, _ = next(MarketGenerator(default_products(3)).stream(300))
+    trader = IndicatorCache(str(tmp_path)).attach(harshcheepak2(), ticks)
+    # Skipping a tick shifts the trader's price count against the rows.
+    skipped = ticks[:100] + ticks[101:]
+    assert Backtester(trader).run(skipped) == Backtester(harshcheepak2()).run(skipped)
+    # KELP's strategy never reads the history stats, so it never checks its rows.
+    assert set(trader.indicator_cache) <= {'KELP'}
@@ -0,0 +1,30 @@
+import numpy as np
+
+from calibrate import estimate_local_level
+from datamodel import OrderDepth
+
+
+def book(bid, ask):
+    depth = OrderDepth()
+    depth.buy_orders[bid] = 10
+    depth.sell_orders[ask] = -10
+    return depth
+
+
+def test_filter_converges_to_a_constant_price(harshcheepak2):
+    trader = harshcheepak2(params={'KELP': {'valuation_strategy': 'kalman', 'kalman_q': 0.5, 'kalman_r': 1.0}})
+    for _ in range(20):
+        trader.get_mid_price('KELP', book(1999, 2001))
+    values = [trader.get_mid_price('KELP', book(2009, 2012)) for _ in range(200)]
+    assert values[0] < values[-1]
+    assert values[-1] == (2009 + 2012) * 256  # 1/512 ticks
+
+
+def test_local_level_fit_recovers_known_noise():
+    rng = np.random.default_rng(0)
+    q, r = 0.6, 0.2
+    level = 10000 + np.cumsum(rng.normal(0, q ** 0.5, 200_000))
+    prices = level + rng.normal(0, r ** 0.5, len(level))
+    q_fit, r_fit = estimate_local_level(prices)
+    assert abs(q_fit - q) < 0.05 * q
+    assert abs(r_fit - r) < 0.05 * r
@@ -0,0 +1,45 @@
+import pytest
+
+from datamodel import TradingState
+
+
+def quotes(trader, mid_price, position):
+    # fair_price_mm's orders for KELP as [(price, quantity), ...].
+    trader.n_orders = 0
+    state = TradingState('', 0, {}, {}, {}, {}, {'KELP': position}, None)
+    trader.fair_price_mm_strategy('KELP', mid_price, state)
+    return [(int(row['price']), int(row['quantity'])) for row in trader.orders[:trader.n_orders]]
+
+
+@pytest.fixture
+def trader(harshcheepak2):
+    return harshcheepak2(params={'KELP': {'strategy': 'fair_price_mm', 'max_position': 50}})
+
+
+def test_flat_ladder_is_centred_on_the_fair_value(trader):
+    # Fair value 2000 ticks, then 2000.5 (prices in 1/512 ticks).
+    assert sorted(quotes(trader, 2000 * 512, 0)) == [(1997, 10), (1998, 10), (1999, 10),
+                                                    (2001, -10), (2002, -10), (2003, -10)]
+    assert sorted(quotes(trader, 2000 * 512 + 256, 0)) == [(1997, 10), (1998, 10), (1999, 10),
+                                                          (2002, -10), (2003, -10), (2004, -10)]
+
+
+@pytest.mark.parametrize('position', [-50, -38, 0, 38, 50])
+@pytest.mark.parametrize('fair', [2000 * 512, 2000 * 512 + 256])
+def test_ladder_never_crosses_and_stays_within_limits(trader, fair, position):
+    orders = quotes(trader, fair, position)
+    bids = [price for price, quantity in orders if quantity > 0]
+    asks = [price for price, quantity in orders if quantity < 0]
+    assert all(2 * price <= fair // 256 for price in bids)
+    assert all(2 * price >= fair // 256 for price in asks)
+    assert sum(q for _, q in orders if q > 0) <= 50 - position
+    assert -sum(q for _, q in orders if q < 0) <= 50 + position
+
+
+def test_sizes_shrink_on_the_side_that_adds_to_the_position(trader):
+    long = quotes(trader, 2000 * 512, 50)
+    short = quotes(trader, 2000 * 512, -50)
+    assert [q for _, q in long if q > 0] == []
+    assert sorted(long) == [(2000, -10), (2001, -10), (2002, -10)]  # skew capped at the half spread
+    assert [q for _, q in short if q < 0] == []
+    assert sorted(short) == [(1998, 10), (1999, 10), (2000, 10)]
@@ -0,0 +1,42 @@
+from datamodel import Order, OrderDepth
+from latency import LatencyBacktester
+
+
+def book(bid, ask, volume):
+    depth = OrderDepth()
+    depth.buy_orders[bid] = volume
+    depth.sell_orders[ask] = -volume
+    return {'KELP': depth}
+
+
+class Lifter:
+    # Tries to lift the 5-lot ask at 101 on every tick.
+    def run(self, state):
+        return {'KELP': [Order('KELP', 101, 5)]}, 0, ''
+
+
+def delays(*values):
+    values = iter(values)
+    return lambda run_seconds: next(values)
+
+
+def test_arrivals_between_snapshots_share_the_book():
+    # Sent at 0 arriving at 150 and sent at 100 arriving at 120: both meet
+    # book(t=100), which only has 5 lots at 101 to give.
+    backtester = LatencyBacktester(Lifter(), delays(150, 20, 1000))
+    backtester.step(0, book(99, 101, 5))
+    backtester.step(100, book(99, 101, 5))
+    backtester.step(200, book(99, 103, 5))
+    fills = backtester.fills[:backtester.n_fills]
+    assert fills['quantity'].sum() == 5
+    assert backtester.position['KELP'] == 5
+
+
+def test_next_snapshot_restores_liquidity():
+    backtester = LatencyBacktester(Lifter(), delays(100, 100, 1000))
+    backtester.step(0, book(99, 101, 5))
+    backtester.step(100, book(99, 101, 5))
+    backtester.step(200, book(99, 101, 5))
+    fills = backtester.fills[:backtester.n_fills]
+    assert fills['timestamp'].tolist() == [100, 200]
+    assert fills['quantity'].sum() == 10
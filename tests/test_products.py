@@ -0,0 +1,38 @@
+from backtester import Backtester
+from datamodel import OrderDepth
+
+
+def book(mid):
+    depth = OrderDepth()
+    depth.buy_orders[mid - 1] = 10
+    depth.sell_orders[mid + 1] = -10
+    return depth
+
+
+def test_churning_symbols_stay_bounded(harshcheepak2):
+    # A new symbol every tick, each quoted for 5 ticks.
+    trader = harshcheepak2(evict_after=10, max_products=32)
+    backtester = Backtester(trader)
+    for tick in range(300):
+        backtester.step(tick * 100, {f'SYM_{i}': book(1000 + i) for i in range(max(0, tick - 4), tick + 1)})
+    live = len(trader.product_params)
+    assert live <= 32
+    assert len(trader.degraded) == live
+    assert len(trader.last_seen) == live
+    assert len(trader.degradation_report()) == live
+
+
+def test_spare_capacity_leaves_the_covariance_alone(harshcheepak2):
+    # The same ticks with room for 4 products and for 1024 give the same
+    # covariance over the live slots.
+    traders = [harshcheepak2(), harshcheepak2()]
+    traders[1].grow(1024)
+    for trader in traders:
+        backtester = Backtester(trader)
+        for tick in range(50):
+            backtester.step(tick * 100, {product: book(1000 + (tick * (k + 3)) % 7) for k, product in
+                                         enumerate(('KELP', 'SQUID_INK', 'RAINFOREST_RESIN'))})
+    n = len(traders[0].products)
+    assert traders[0].cov[:n, :n].any()
+    assert (traders[0].cov[:n, :n] == traders[1].cov[:n, :n]).all()
+    assert not traders[1].cov[n:].any()
@@ -0,0 +1,12 @@
+from synthetic_market import MarketGenerator, default_products
+from sweep import grid
+from walkforward import walk_forward
+
+
+def test_results_do_not_depend_on_how_candidates_are_split(harshcheepak2_path):
+    ticks, _ = next(MarketGenerator(default_products(3)).stream(600))
+    candidates = grid(window_size=[3, 5, 10], base_qty=[5, 10])
+    runs = [walk_forward(harshcheepak2_path, ticks, ['SQUID_INK', 'KELP'], candidates, 3, workers=workers)[0]
+            for workers in (1, 3)]
+    assert runs[0] == runs[1]
+    assert len(runs[0]) == 6
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import struct
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from backtester import arrays_to_ticks, read_prices, read_trades, ticks_to_arrays
+from datamodel import Trade
+
+# Compact archive of recorded books and trades. Prices and volumes are small
+# integers that change slowly, so each column (one per product, side, field
+# and level) is stored as tick-to-tick deltas, zigzag-mapped to unsigned and
+# written as varints, with runs of zeros (unchanged values) collapsed to a
+# zero and the run length. Deeper levels' prices are stored relative to the
+# best price on their side, and an empty level repeats its last price (its
+# zero volume marks it empty), so neither shows up as a jump. Ticks are
+# grouped into fixed-size chunks that decode on their own, and a footer index
+# of (first timestamp, last timestamp, offset) per chunk lets a reader load
+# just a time range. Encoding and decoding are vectorised over whole chunks.
+#
+#   python tick_archive.py prices.csv [trades.csv] -o day0.tka
+#   python backtester.py harshcheepak2.py day0.tka
+#
+# Layout: MAGIC, header length, JSON header, chunks, index, index offset.
+# A chunk is CHUNK_HEADER (ticks, trades, book tokens, trade tokens, book
+# bytes, trade bytes), the book varints (timestamps, then
+# book[field, product, level, tick]) and the trade varints (timestamp,
+# symbol, price, quantity, buyer, seller columns).
+
+MAGIC = b'TKAR\x01'
+LENGTH = struct.Struct('<Q')
+CHUNK_HEADER = struct.Struct('<IIIIQQ')
+TRADE_COLUMNS = 6
+SHIFTS = np.arange(0, 70, 7, dtype=np.uint64)
+
+
+def zigzag(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def unzigzag(values):
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def encode_varints(values):
+    # Each value becomes 7-bit groups, low first, with the high bit set on
+    # every group but its last.
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    groups = (values[:, None] >> SHIFTS) & np.uint64(0x7f)
+    bits = np.zeros(len(values), dtype=np.int64)
+    nonzero = values > 0
+    bits[nonzero] = np.floor(np.log2(values[nonzero].astype(np.float64))).astype(np.int64) + 1
+    # log2 in float64 can round up just below a power of two; fix with an exact check.
+    bits[nonzero] -= (values[nonzero] >> (bits[nonzero] - 1).astype(np.uint64)) == 0
+    lengths = np.maximum(1, (bits + 6) // 7)
+    k = np.arange(len(SHIFTS))
+    groups[k[None, :] < (lengths - 1)[:, None]] |= np.uint64(0x80)
+    return groups[k[None, :] < lengths[:, None]].astype(np.uint8).tobytes()
+
+
+def decode_varints(data, count):
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64)
+    last = raw < 0x80
+    starts = np.empty(count, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = np.flatnonzero(last)[:-1] + 1
+    value_index = np.cumsum(last) - last
+    shifts = (np.arange(len(raw)) - starts[value_index]).astype(np.uint64) * np.uint64(7)
+    parts = (raw & 0x7f).astype(np.uint64) << shifts
+    return np.bitwise_or.reduceat(parts, starts)
+
+
+def encode_zero_runs(values):
+    # Zigzagged values are only zero where the delta was, so a zero token
+    # always starts a run and the token after it is the run's length.
+    zero = values == 0
+    run_start = zero.copy()
+    run_start[1:] &= ~zero[:-1]
+    starts = np.flatnonzero(run_start)
+    ends = np.flatnonzero(zero & np.append(~zero[1:], True))
+    keep = ~zero | run_start
+    kept = values[keep]
+    kept_start = run_start[keep]
+    positions = np.arange(len(kept)) + np.cumsum(kept_start) - kept_start
+    tokens = np.zeros(len(kept) + len(starts), dtype=np.uint64)
+    tokens[positions] = kept
+    tokens[positions[kept_start] + 1] = (ends - starts + 1).astype(np.uint64)
+    return tokens
+
+
+def decode_zero_runs(tokens):
+    marker = tokens == 0
+    is_length = np.zeros(len(tokens), dtype=bool)
+    is_length[1:] = marker[:-1]
+    counts = np.ones(len(tokens), dtype=np.int64)
+    counts[marker] = tokens[np.flatnonzero(marker) + 1].astype(np.int64)
+    counts[is_length] = 0
+    return np.repeat(tokens, counts)
+
+
+def encode_column(values):
+    tokens = encode_zero_runs(zigzag(values))
+    return encode_varints(tokens), len(tokens)
+
+
+def decode_column(data, count):
+    return unzigzag(decode_zero_runs(decode_varints(data, count)))
+
+
+def delta(columns):
+    # Deltas along the last (tick) axis, starting from zero so a chunk needs nothing before it.
+    out = columns.copy()
+    out[..., 1:] -= columns[..., :-1]
+    return out
+
+
+class TickArchiveWriter:
+    def __init__(self, path, products, levels, chunk_size=1024):
+        self.f = open(path, 'wb')
+        self.products = list(products)
+        self.levels = levels
+        self.chunk_size = chunk_size
+        self.symbols = {product: i for i, product in enumerate(self.products)}
+        self.names = {}
+        self.index = []
+        self.header = {'products': self.products, 'levels': levels, 'chunk_size': chunk_size}
+        header = json.dumps(self.header).encode()
+        self.f.write(MAGIC + LENGTH.pack(len(header)) + header)
+
+    def name_id(self, name):
+        if name is None:
+            return -1
+        if name not in self.names:
+            self.names[name] = len(self.names)
+        return self.names[name]
+
+    def write_chunk(self, timestamps, book, trades=()):
+        # book is book[field, tick, product, level] as from ticks_to_arrays;
+        # trades are Trade objects with timestamps inside this chunk.
+        columns = np.ascontiguousarray(book.transpose(0, 2, 3, 1))
+        for side in (0, 2):
+            prices = columns[side]
+            empty = columns[side + 1] == 0
+            # Carry the last price forward over empty levels.
+            last = np.where(empty, 0, np.arange(prices.shape[-1]))
+            np.maximum.accumulate(last, axis=-1, out=last)
+            prices[...] = np.where(empty, np.take_along_axis(prices, last, axis=-1), prices)
+            prices[:, 1:] -= prices[:, :1]
+        book_bytes, book_tokens = encode_column(np.concatenate([delta(timestamps), delta(columns).ravel()]))
+        trade_columns = np.array([[t.timestamp, self.symbols.setdefault(t.symbol, len(self.symbols)), t.price,
+                                   t.quantity, self.name_id(t.buyer), self.name_id(t.seller)] for t in trades],
+                                 dtype=np.int64).reshape(-1, TRADE_COLUMNS).T
+        trade_bytes, trade_tokens = encode_column(delta(trade_columns).ravel())
+        self.index.append((int(timestamps[0]), int(timestamps[-1]), self.f.tell()))
+        self.f.write(CHUNK_HEADER.pack(len(timestamps), len(trades), book_tokens, trade_tokens, len(book_bytes),
+                                       len(trade_bytes)))
+        self.f.write(book_bytes)
+        self.f.write(trade_bytes)
+
+    def close(self):
+        # Symbols and trader names are only known once every trade is in, so
+        # they are written with the index.
+        offset = self.f.tell()
+        footer = json.dumps({'index': self.index, 'symbols': list(self.symbols), 'names': list(self.names)}).encode()
+        self.f.write(footer + LENGTH.pack(offset))
+        self.f.close()
+
+
+def write_archive(path, ticks, market_trades=None, chunk_size=1024):
+    timestamps, products, book = ticks_to_arrays(ticks)
+    writer = TickArchiveWriter(path, products, book.shape[3], chunk_size)
+    market_trades = market_trades or {}
+    for start in range(0, len(timestamps), chunk_size):
+        end = min(start + chunk_size, len(timestamps))
+        # Trades between two chunks go with the later one's first tick.
+        low = timestamps[start - 1] if start else -np.inf
+        trades = [trade for timestamp in sorted(market_trades) if low < timestamp <= timestamps[end - 1]
+                  for symbol_trades in market_trades[timestamp].values() for trade in symbol_trades]
+        writer.write_chunk(timestamps[start:end], book[:, start:end], trades)
+    writer.close()
+
+
+class TickArchive:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        if not self.data.startswith(MAGIC):
+            raise ValueError(f'{path} is not a tick archive')
+        header_length = LENGTH.unpack_from(self.data, len(MAGIC))[0]
+        header_start = len(MAGIC) + LENGTH.size
+        header = json.loads(self.data[header_start:header_start + header_length])
+        self.products = header['products']
+        self.levels = header['levels']
+        self.chunk_size = header['chunk_size']
+        footer_offset = LENGTH.unpack_from(self.data, len(self.data) - LENGTH.size)[0]
+        footer = json.loads(self.data[footer_offset:len(self.data) - LENGTH.size])
+        self.index = np.array(footer['index'], dtype=np.int64).reshape(-1, 3)
+        self.symbols = footer['symbols']
+        self.names = footer['names']
+
+    def chunks_between(self, start=None, end=None):
+        first = 0 if start is None else int(np.searchsorted(self.index[:, 1], start, 'left'))
+        last = len(self.index) if end is None else int(np.searchsorted(self.index[:, 0], end, 'right'))
+        return range(first, last)
+
+    def chunk(self, i):
+        offset = int(self.index[i, 2])
+        n_ticks, n_trades, book_tokens, trade_tokens, book_length, trade_length = \
+            CHUNK_HEADER.unpack_from(self.data, offset)
+        offset += CHUNK_HEADER.size
+        values = decode_column(self.data[offset:offset + book_length], book_tokens)
+        timestamps = np.cumsum(values[:n_ticks])
+        columns = np.cumsum(values[n_ticks:].reshape(4, len(self.products), self.levels, n_ticks), axis=3)
+        for side in (0, 2):
+            columns[side, :, 1:] += columns[side, :, :1]
+            columns[side] *= columns[side + 1] != 0
+        book = columns.transpose(0, 3, 1, 2)
+        offset += book_length
+        trades = np.cumsum(decode_column(self.data[offset:offset + trade_length], trade_tokens)
+                           .reshape(TRADE_COLUMNS, n_trades), axis=1)
+        return timestamps, book, trades
+
+    def read(self, start=None, end=None):
+        # Columnar (timestamps, products, book) for start <= timestamp <= end.
+        chunks = [self.chunk(i) for i in self.chunks_between(start, end)]
+        if not chunks:
+            return np.zeros(0, dtype=np.int64), self.products, np.zeros((4, 0, len(self.products), self.levels),
+                                                                         dtype=np.int64)
+        timestamps = np.concatenate([c[0] for c in chunks])
+        book = np.concatenate([c[1] for c in chunks], axis=1)
+        keep = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            keep &= timestamps >= start
+        if end is not None:
+            keep &= timestamps <= end
+        return timestamps[keep], self.products, book[:, keep]
+
+    def ticks(self, start=None, end=None):
+        return arrays_to_ticks(*self.read(start, end))
+
+    def market_trades(self, start=None, end=None):
+        # Same shape as backtester.read_trades.
+        trades = defaultdict(lambda: defaultdict(list))
+        for i in self.chunks_between(start, end):
+            columns = self.chunk(i)[2].tolist()
+            for timestamp, symbol, price, quantity, buyer, seller in zip(*columns):
+                if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                    continue
+                symbol = self.symbols[symbol]
+                trades[timestamp][symbol].append(Trade(symbol, price, quantity, self.names[buyer] if buyer >= 0 else None,
+                                                       self.names[seller] if seller >= 0 else None, timestamp))
+        return trades
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('prices')
+    parser.add_argument('trades', nargs='?')
+    parser.add_argument('-o', '--out', required=True)
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    ticks = read_prices(args.prices)
+    trades = read_trades(args.trades) if args.trades else {}
+    csv_seconds = time.perf_counter() - began
+    csv_bytes = os.path.getsize(args.prices) + (os.path.getsize(args.trades) if args.trades else 0)
+    write_archive(args.out, ticks, trades, args.chunk_size)
+
+    began = time.perf_counter()
+    archive = TickArchive(args.out)
+    archive.read()
+    array_seconds = time.perf_counter() - began
+    archive.ticks()
+    archive.market_trades()
+    archive_seconds = time.perf_counter() - began
+    archive_bytes = os.path.getsize(args.out)
+    print(f"csv {csv_bytes} bytes, loaded in {csv_seconds * 1000:.1f}ms")
+    print(f"archive {archive_bytes} bytes ({csv_bytes / archive_bytes:.1f}x smaller), "
+          f"loaded in {archive_seconds * 1000:.1f}ms ({csv_seconds / archive_seconds:.1f}x faster), "
+          f"book arrays alone in {array_seconds * 1000:.1f}ms")
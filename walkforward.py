@@ -0,0 +1,207 @@
+import argparse
+import ast
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtester import Backtester, arrays_to_ticks, load_trader, read_prices, ticks_to_arrays
+from indicator_cache import IndicatorCache
+from result_cache import make_trader
+from sweep import grid
+from warm_start import TAIL_TICKS, mid_rows
+
+# Walk-forward optimisation. The data is cut into rolling train/test folds;
+# each product's sweep runs in worker processes, split by candidate, that
+# read their slice of the book from shared memory instead of getting a
+# pickled copy. A worker walks its candidates through the folds in order:
+# folds overlap, so each candidate's indicator state where the next fold
+# begins is handed on to it rather than rebuilt, and the first fold is
+# warm-started (warm_start.py) from the warm_ticks before it, by default
+# TAIL_TICKS for Traders that support it (0 turns this off). The winning
+# candidate's backtest is resumed straight into the test window.
+#
+#   python walkforward.py harshcheepak2.py prices.csv --products SQUID_INK KELP \
+#       --grid window_size=3,5,10,20 base_qty=5,10 --folds 5 --train 0.3 --test 0.1
+
+
+class SharedBook:
+    def __init__(self, ticks):
+        timestamps, self.products, book = ticks_to_arrays(ticks)
+        self.blocks = []
+        self.meta = {'products': self.products}
+        for name, array in (('timestamps', timestamps), ('book', book)):
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.meta[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+def attach_ticks(meta, start, end, product):
+    # Rebuild one product's ticks for [start, end) from the shared arrays.
+    blocks = []
+    arrays = {}
+    for name in ('timestamps', 'book'):
+        block_name, shape, dtype = meta[name]
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype, buffer=block.buf)
+    i = meta['products'].index(product)
+    ticks = arrays_to_ticks(arrays['timestamps'], [product], arrays['book'][:, :, i:i + 1], start, end)
+    del arrays
+    for block in blocks:
+        block.close()
+    return ticks
+
+
+def folds(n_ticks, n_folds, train_fraction, test_fraction):
+    train = int(n_ticks * train_fraction)
+    test = int(n_ticks * test_fraction)
+    step = (n_ticks - train - test) // max(n_folds - 1, 1)
+    return [(k * step, k * step + train, k * step + train + test) for k in range(n_folds)]
+
+
+def run_folds(trader_path, meta, product, fold_list, candidates, indicator_dir=None, warm_ticks=None):
+    # One product's folds in order for a chunk of (index, candidate) pairs.
+    # Folds overlap, so each candidate's indicator state at the tick where
+    # the next fold starts is snapshotted and handed on to that fold instead
+    # of being rebuilt; folds with no such state (the first, or one starting
+    # past the previous training window) are warm-started from the
+    # warm_ticks before them. Returns the chunk's best candidate per fold.
+    began = time.perf_counter()
+    trader_class = load_trader(trader_path)
+    if warm_ticks is None:
+        warm_ticks = TAIL_TICKS if hasattr(trader_class, 'warm_up') else 0
+    reuse = hasattr(trader_class, 'snapshot')
+    indicators = IndicatorCache(indicator_dir) if indicator_dir else None
+
+    handoff = {}
+    results = []
+    for k, (start, split, end) in enumerate(fold_list):
+        ticks = attach_ticks(meta, start, end, product)
+        train, test = ticks[:split - start], ticks[split - start:]
+        handoff_at = fold_list[k + 1][0] - start if k + 1 < len(fold_list) else 0
+        if not reuse or not 0 < handoff_at <= len(train):
+            handoff_at = 0
+        rows = None
+        next_handoff = {}
+        best = None
+        for index, candidate in candidates:
+            warm = handoff.get(index)
+            if warm is None and warm_ticks:
+                if rows is None:
+                    rows = mid_rows(attach_ticks(meta, max(0, start - warm_ticks), start, product))
+                warm = rows
+            trader = make_trader(trader_class, {product: candidate}, warm)
+            if indicators is not None:
+                # Over the whole fold, since the winner carries on into the test window.
+                indicators.attach(trader, ticks, [product])
+            backtester = Backtester(trader)
+            if handoff_at:
+                backtester.run(train[:handoff_at])
+                next_handoff[index] = trader.snapshot()
+            score = backtester.run(train[handoff_at:]).get(product, 0.0)
+            if best is None or score > best[2]:
+                best = (index, candidate, score, backtester)
+        handoff = next_handoff
+        index, candidate, train_score, backtester = best
+        test_score = backtester.run(test).get(product, 0.0) - train_score
+        results.append((index, product, (start, split, end), candidate, train_score, test_score))
+    return results, time.perf_counter() - began
+
+
+def walk_forward(trader_path, ticks, products, candidates, n_folds=5, train_fraction=0.3, test_fraction=0.1,
+                 workers=None, indicator_dir=None, warm_ticks=None, measure_serial=False):
+    # Jobs are (product, chunk of candidates), each walking every fold so
+    # state can be handed from fold to fold; the best train score per
+    # (product, fold) across chunks wins, ties going to the earlier
+    # candidate. Returns the results, the parallel wall clock, the summed
+    # job times and, with measure_serial, the wall clock of running the same
+    # jobs one after another in this process.
+    fold_list = folds(len(ticks), n_folds, train_fraction, test_fraction)
+    n_chunks = max(1, min(len(candidates), -(-2 * (workers or os.cpu_count() or 1) // len(products))))
+    indexed = list(enumerate(candidates))
+    chunks = [indexed[i::n_chunks] for i in range(n_chunks)]
+    jobs = [(trader_path, product, fold_list, chunk, indicator_dir, warm_ticks)
+            for product in products for chunk in chunks]
+
+    shared = SharedBook(ticks)
+    try:
+        began = time.perf_counter()
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(run_folds, path, shared.meta, product, fold_list, chunk, cache, warm)
+                       for path, product, fold_list, chunk, cache, warm in jobs]
+            outputs = [future.result() for future in futures]
+        wall = time.perf_counter() - began
+        serial = None
+        if measure_serial:
+            began = time.perf_counter()
+            for path, product, fold_list, chunk, cache, warm in jobs:
+                run_folds(path, shared.meta, product, fold_list, chunk, cache, warm)
+            serial = time.perf_counter() - began
+    finally:
+        shared.close()
+
+    best = {}
+    for chunk_results, _ in outputs:
+        for index, product, fold, candidate, train_score, test_score in chunk_results:
+            current = best.get((product, fold))
+            if current is None or (train_score, -index) > (current[4], -current[0]):
+                best[(product, fold)] = (index, product, fold, candidate, train_score, test_score)
+    results = [best[(product, fold)][1:] for product in products for fold in fold_list]
+    return results, wall, sum(seconds for _, seconds in outputs), serial
+
+
+def stable_params(results):
+    # Per product, the candidate that won the most folds, with its mean
+    # out-of-sample PnL over the folds it won.
+    summary = {}
+    for product in dict.fromkeys(result[0] for result in results):
+        wins = [r for r in results if r[0] == product]
+        counts = Counter(repr(r[2]) for r in wins)
+        winner, count = counts.most_common(1)[0]
+        tests = [r[4] for r in wins if repr(r[2]) == winner]
+        summary[product] = (ast.literal_eval(winner), count, len(wins), sum(tests) / len(tests))
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trader')
+    parser.add_argument('prices')
+    parser.add_argument('--products', nargs='+', required=True)
+    parser.add_argument('--grid', nargs='+', required=True, help='name=v1,v2,... (Python literals)')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--train', type=float, default=0.3)
+    parser.add_argument('--test', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--indicator-cache', default=None, help='directory for shared indicator series')
+    parser.add_argument('--warm-ticks', type=int, default=None,
+                        help=f'warm-start candidates on this many earlier ticks (default {TAIL_TICKS}, 0 for cold)')
+    parser.add_argument('--measure-serial', action='store_true', help='also time the same jobs run serially')
+    args = parser.parse_args()
+
+    axes = {}
+    for axis in args.grid:
+        name, values = axis.split('=', 1)
+        axes[name] = list(ast.literal_eval(f'[{values}]'))
+    results, wall, job_seconds, serial = walk_forward(args.trader, read_prices(args.prices), args.products,
+                                                      grid(**axes), args.folds, args.train, args.test, args.workers,
+                                                      args.indicator_cache, args.warm_ticks, args.measure_serial)
+    for product, fold, candidate, train_score, test_score in results:
+        print(f"{product:<18} fold {fold}  train={train_score:>9.1f}  test={test_score:>9.1f}  {candidate}")
+    for product, (candidate, count, total, test) in stable_params(results).items():
+        print(f"{product}: {candidate} won {count}/{total} folds, mean test pnl {test:.1f}")
+    if serial is not None:
+        print(f"wall clock {wall:.2f}s vs {serial:.2f}s measured serial ({serial - wall:.2f}s saved)")
+    else:
+        print(f"wall clock {wall:.2f}s; jobs took {job_seconds:.2f}s in total "
+              f"(an estimate of serial time, --measure-serial runs it)")
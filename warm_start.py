@@ -0,0 +1,73 @@
+import argparse
+import json
+from collections import deque
+
+from backtester import Backtester, load_trader, read_prices
+from result_cache import make_trader
+
+# Warm starts for harshcheepak2.py. Trader(warm_start=...) takes either the
+# tail of recorded data as mid rows, [{product: mid}, ...] oldest first, or a
+# snapshot() of a Trader that has already seen that tail. The rows come from
+# the end of any recording (price CSV, tick archive, recorder log); a
+# snapshot is the compact form to keep between sessions.
+#
+#   python warm_start.py harshcheepak2.py prices_day_-1.csv -o warm.json
+#   python warm_start.py harshcheepak2.py prices_day_-1.csv --compare prices_day_0.csv
+
+TAIL_TICKS = 200
+
+
+def mid_rows(ticks):
+    # {product: mid} per tick, for products quoted on both sides.
+    return [{product: (max(depth.buy_orders) + min(depth.sell_orders)) / 2
+             for product, depth in depths.items() if depth.buy_orders and depth.sell_orders}
+            for _, depths in ticks]
+
+
+def tail_ticks(path, n=TAIL_TICKS):
+    if path.endswith('.tka'):
+        from tick_archive import TickArchive
+        archive = TickArchive(path)
+        # Only the last chunks that can hold n ticks are decoded.
+        first = max(0, len(archive.index) - (-(-n // archive.chunk_size) + 1))
+        start = int(archive.index[first, 0]) if len(archive.index) else None
+        return archive.ticks(start)[-n:]
+    if path.endswith('.trlog'):
+        from recorder import Replayer
+        tail = deque(maxlen=n)
+        for state in Replayer(path).states():
+            tail.append((state.timestamp, state.order_depths))
+        return list(tail)
+    return read_prices(path)[-n:]
+
+
+def tail_rows(path, n=TAIL_TICKS):
+    return mid_rows(tail_ticks(path, n))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('trader')
+    parser.add_argument('recording', help='prices CSV, .tka tick archive or .trlog recorder log')
+    parser.add_argument('--ticks', type=int, default=TAIL_TICKS, help='how many ticks from the end to warm up on')
+    parser.add_argument('-o', '--out', default=None, help='write the warmed-up snapshot as JSON')
+    parser.add_argument('--compare', default=None, help='prices CSV to backtest cold and warm')
+    args = parser.parse_args()
+
+    trader_class = load_trader(args.trader)
+    rows = tail_rows(args.recording, args.ticks)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(make_trader(trader_class, warm_start=rows).snapshot(), f)
+        print(f"warmed up on {len(rows)} ticks, snapshot written to {args.out}")
+    if args.compare:
+        ticks = read_prices(args.compare)
+        for label, warm in (('cold', None), ('warm', rows)):
+            backtester = Backtester(make_trader(trader_class, warm_start=warm), record_orders=True)
+            first = None
+            for i, (timestamp, order_depths) in enumerate(ticks):
+                backtester.step(timestamp, order_depths)
+                if first is None and backtester.n_logged:
+                    first = i
+            pnl = backtester.pnl()
+            print(f"{label}: first order on tick {first}, pnl={sum(pnl.values()):.1f}")